@@ -636,6 +636,7 @@ def create_admin_router(
                 slug = key.split("__", 1)[1]
                 updates.setdefault(slug, {})["prompt"] = value
 
+        batch: dict[str, tuple[str, str | None]] = {}
         for slug, data in updates.items():
             if slug in BASE_STYLE_DATA:
                 continue  # base personas are file-based, skip DB writes
@@ -646,9 +647,15 @@ def create_admin_router(
             prompt = data.get("prompt", record.prompt)
             display = data.get("display", record.display_name)
             try:
-                await personas.set(slug, prompt, display_name=display)
+                personas.normalize_entry(slug, display)
             except ValueError as exc:
                 errors.append(str(exc))
+                continue
+            batch[slug] = (prompt, display)
+        try:
+            await personas.set_many(batch)
+        except ValueError as exc:
+            errors.append(str(exc))
 
         new_style = (form.get("new_style") or "").strip().lower()
         new_display = (form.get("new_display") or "").strip()
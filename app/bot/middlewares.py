@@ -13,6 +13,7 @@ from ..services.games.storychain import StorychainService
 from ..services.games.wordchain import WordchainService
 from ..services.guess_game import GuessGameService
 from ..services.interjector import InterjectorService
+from ..services.message_history import MessagePersister
 from ..services.monthly_champion import MonthlyChampionService
 from ..services.persona import StylePromptService
 from ..services.quick_games import QuickGameService
@@ -69,6 +70,7 @@ class ServicesMiddleware(BaseMiddleware):
         rapbattle: RapbattleService,
         storychain: StorychainService,
         spy_subscriptions: SpySubscriptionService,
+        persister: MessagePersister,
     ):
         self.settings = settings
         self.context = context
@@ -92,6 +94,7 @@ class ServicesMiddleware(BaseMiddleware):
         self.rapbattle = rapbattle
         self.storychain = storychain
         self.spy_subscriptions = spy_subscriptions
+        self.persister = persister
 
     async def __call__(
         self,
@@ -121,4 +124,5 @@ class ServicesMiddleware(BaseMiddleware):
         data["rapbattle"] = self.rapbattle
         data["storychain"] = self.storychain
         data["spy_subscriptions"] = self.spy_subscriptions
+        data["persister"] = self.persister
         return await handler(event, data)
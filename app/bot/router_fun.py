@@ -78,6 +78,8 @@ def _resolve_prompt_token_limit(conf: dict[str, object]) -> int:
 
 
 def _split_message(text: str, limit: int = 4096) -> List[str]:
+    if len(text) <= limit:
+        return [text] if text else []
     chunks: List[str] = []
     remaining = text
     while remaining:
@@ -212,7 +214,11 @@ async def cmd_summary(
         await message.reply("Команда доступна только в групповых чатах.")
         return
 
-    conf = await settings.get_all(message.chat.id)
+    # Chat settings and global config are independent lookups; fetch them together.
+    conf, app_conf = await asyncio.gather(
+        settings.get_all(message.chat.id),
+        app_config.get_all(),
+    )
     if not conf.get("is_active", True):
         await message.reply("Бот выключен в этом чате.")
         return
@@ -223,7 +229,6 @@ async def cmd_summary(
         return
 
     async with lock:
-        app_conf = await app_config.get_all()
         provider = resolve_llm_options(app_conf)
         max_turns_raw = app_conf.get("context_max_turns", 100) or 100
         try:
@@ -503,10 +508,6 @@ async def cmd_reg(message: types.Message, session: AsyncSession, roulette: Roule
         user.id,
         user.username,
     )
-    try:
-        total = await message.bot.get_chat_member_count(message.chat.id)
-    except Exception:
-        total = None
     suffix = f" (зарегистрировано: {registered})"
     if is_new:
         await message.reply(f"Вы зарегистрированы для рулетки{suffix}.")
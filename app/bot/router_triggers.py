@@ -1,16 +1,19 @@
+import asyncio
 import logging
 import os
 import re
+from dataclasses import dataclass, field
+from itertools import chain
 from typing import Any
 
 from aiogram import Bot, F, Router, types
 from aiogram.enums import ChatType, MessageEntityType
 from sqlalchemy import update
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.message import Message as DBMessage
 from ..services.context import (
+    ChatTurn,
     ContextService,
     build_messages,
     build_system_prompt,
@@ -26,7 +29,11 @@ from ..services.llm.client import (
 )
 from ..services.llm.vision import download_file_id_as_data_url
 from ..services.llm.whisper import transcribe_file_id
-from ..services.message_history import persist_telegram_message, store_telegram_message
+from ..services.message_history import (
+    MessagePersister,
+    persist_telegram_message,
+    store_telegram_message,
+)
 from ..services.reply_images import collect_reply_images
 from ..services.reply_voice import (
     VIDEO_NOTE_MARKER,
@@ -42,6 +49,7 @@ from ..services.spontaneity import ActionKind, InterjectTrigger, SpontaneityPoli
 from ..services.usage_limits import UsageLimiter
 from ..services.user_memory import UserMemoryService
 from ..utils.llm import resolve_temperature
+from ..utils.locks import ChatLockRegistry
 from .constants import START_PRIVATE_RESPONSE
 from .typing_indicator import keep_typing
 from .voice_reply import send_reply_maybe_voice
@@ -50,6 +58,35 @@ from .voice_reply import send_reply_maybe_voice
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True, slots=True)
+class BotIdentity:
+    id: int
+    username: str | None
+    mention_re: re.Pattern[str] | None = field(default=None, compare=False, repr=False)
+    username_lower: str | None = field(default=None, compare=False, repr=False)
+
+    @classmethod
+    def build(cls, bot_id: int, username: str | None) -> "BotIdentity":
+        mention_re = re.compile(rf"@{re.escape(username)}\b", re.IGNORECASE) if username else None
+        username_lower = username.lower() if username else None
+        return cls(id=bot_id, username=username, mention_re=mention_re, username_lower=username_lower)
+
+
+_BOT_IDENTITIES: dict[int, BotIdentity] = {}
+# Serializes history writes within a chat; different chats still persist concurrently.
+_PERSIST_LOCKS = ChatLockRegistry()
+
+
+async def get_bot_identity(bot: Bot) -> BotIdentity:
+    """Return the bot's id/username, calling getMe only once per bot."""
+    identity = _BOT_IDENTITIES.get(bot.id)
+    if identity is None:
+        me = await bot.get_me()
+        identity = BotIdentity.build(me.id, me.username)
+        _BOT_IDENTITIES[bot.id] = identity
+    return identity
+
+
 def build_vision_messages(
     *,
     system_prompt: str,
@@ -96,9 +133,10 @@ async def collect_messages(
     usage_limits: UsageLimiter,
     memory: UserMemoryService,
     policy: SpontaneityPolicy,
+    persister: MessagePersister,
     bot: Bot,
 ):
-    bot_user = await bot.get_me()
+    bot_user = await get_bot_identity(bot)
 
     if _is_own_message(message, bot_user.id):
         return
@@ -110,34 +148,37 @@ async def collect_messages(
         await message.answer(START_PRIVATE_RESPONSE)
         return
 
-    await store_telegram_message(session, message)
-
-    try:
-        await session.commit()
-    except IntegrityError as exc:
-        await session.rollback()
+    async with _PERSIST_LOCKS.get(message.chat.id):
+        try:
+            created = await store_telegram_message(session, message)
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+    if not created:
+        # message already stored (redelivered update), continue without responding
         logger.debug(
-            "Integrity error while persisting message chat=%s message_id=%s: %s",
+            "Duplicate message ignored chat=%s message_id=%s",
             message.chat.id,
             message.message_id,
-            exc,
         )
-        # message already stored or race condition, continue without responding
-        return
-    except Exception:
-        await session.rollback()
-        raise
-
-    conf = await settings.get_all(message.chat.id)
-    if not conf.get("is_active", True):
         return
 
     if _is_command(message):
         logger.debug("Skip command message chat=%s text=%r", message.chat.id, message.text)
         return
 
-    is_mention = _is_bot_mentioned(message, bot_user.id, bot_user.username)
-    is_reply_to_bot = _is_reply(message, bot_user.id, bot_user.username)
+    # Independent config lookups (all cache-backed); issue them together instead of in sequence.
+    conf, app_conf, style_prompts = await asyncio.gather(
+        settings.get_all(message.chat.id),
+        app_config.get_all(),
+        personas.get_all(),
+    )
+    if not conf.get("is_active", True):
+        return
+
+    is_mention = _is_bot_mentioned(message, bot_user)
+    is_reply_to_bot = _is_reply(message, bot_user)
 
     logger.debug(
         "Trigger check chat=%s type=%s mention=%s reply=%s text=%r entities=%s",
@@ -149,7 +190,6 @@ async def collect_messages(
         message.entities,
     )
 
-    app_conf = await app_config.get_all()
     provider = resolve_llm_options(app_conf)
     base_prompt = str(app_conf.get("prompt_chat_base") or DEFAULT_CHAT_PROMPT)
     focus_suffix = str(app_conf.get("prompt_focus_suffix") or DEFAULT_FOCUS_SUFFIX)
@@ -157,14 +197,21 @@ async def collect_messages(
 
     max_turns = int(app_conf.get("context_max_turns", 100) or 100)
     prompt_token_limit = _resolve_prompt_token_limit(app_conf)
-    style_prompts = await personas.get_all()
-    turns = await context.get_recent_turns(session, message.chat.id, max_turns)
-    if await policy.can_react(message.chat.id):
+    should_reply = _should_reply(is_mention, is_reply_to_bot, message.chat.type)
+    can_react = await policy.can_react(message.chat.id)
+    # Plain chatter that nobody reacts to never needs the history query.
+    turns: list[ChatTurn] = []
+    turns_loaded = should_reply or can_react
+    if turns_loaded:
+        turns = await context.get_recent_turns(session, message.chat.id, max_turns)
+    if can_react:
         reacted = await reactions.generate_reaction(message, conf, app_conf, turns)
         if reacted:
             await policy.mark_acted(chat_id=message.chat.id, action=ActionKind.REACTION)
+        else:
+            await policy.release(chat_id=message.chat.id, action=ActionKind.REACTION)
 
-    if _should_reply(is_mention, is_reply_to_bot, message.chat.type):
+    if should_reply:
         llm_limit_raw = app_conf.get("llm_daily_limit", 0) or 0
         try:
             llm_limit = int(llm_limit_raw)
@@ -182,9 +229,8 @@ async def collect_messages(
         focus_text = None
         if raw_focus and (is_reply_to_bot or is_mention):
             cleaned = raw_focus
-            if bot_user.username:
-                pattern = re.compile(rf"@{re.escape(bot_user.username)}", re.IGNORECASE)
-                cleaned = pattern.sub("", cleaned)
+            if bot_user.mention_re is not None:
+                cleaned = bot_user.mention_re.sub("", cleaned)
             focus_text = " ".join(cleaned.split()) or None
         system_prompt = build_system_prompt(
             conf,
@@ -218,9 +264,7 @@ async def collect_messages(
 
         reply_transcript_block: str | None = None
         replied = message.reply_to_message
-        reply_to_non_bot = replied is not None and not _is_reply_to_bot(
-            replied, bot_user.id, bot_user.username
-        )
+        reply_to_non_bot = replied is not None and not _is_reply_to_bot(replied, bot_user)
         if reply_to_non_bot:
             try:
                 reply_transcript = await get_reply_voice_transcript(
@@ -343,21 +387,23 @@ async def collect_messages(
         if sent_reply is None:
             return
         await policy.mark_acted(chat_id=message.chat.id, action=ActionKind.DIRECT_REPLY)
-        try:
-            await store_telegram_message(
-                session,
-                sent_reply,
-                reply_to_message_id=message.message_id,
-            )
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            logger.exception(
-                "Failed to persist bot reply chat=%s source_message=%s reply_message=%s",
-                message.chat.id,
-                message.message_id,
-                sent_reply.message_id,
-            )
+        # The reply is already delivered; its history row can be written in the background.
+        if not persister.enqueue(sent_reply, reply_to_message_id=message.message_id):
+            try:
+                await store_telegram_message(
+                    session,
+                    sent_reply,
+                    reply_to_message_id=message.message_id,
+                )
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                logger.exception(
+                    "Failed to persist bot reply chat=%s source_message=%s reply_message=%s",
+                    message.chat.id,
+                    message.message_id,
+                    sent_reply.message_id,
+                )
         if sidecar is not None and message.from_user:
             try:
                 await memory.apply_sidecar_update(
@@ -374,9 +420,15 @@ async def collect_messages(
         return
 
     if await policy.can_interject(message.chat.id, trigger=InterjectTrigger.NEW_MESSAGE):
-        sent = await interjector.generate_spontaneous_reply(message, conf, turns)
+        if not turns_loaded:
+            turns = await context.get_recent_turns(session, message.chat.id, max_turns)
+        sent = await interjector.generate_spontaneous_reply(
+            message, conf, turns, app_conf=app_conf
+        )
         if sent:
             await policy.mark_acted(chat_id=message.chat.id, action=ActionKind.INTERJECT)
+        else:
+            await policy.release(chat_id=message.chat.id, action=ActionKind.INTERJECT)
 
 
 @router.message(F.sticker | F.animation | F.photo | F.video | F.document | F.voice | F.video_note)
@@ -393,28 +445,26 @@ async def handle_media_messages(
     policy: SpontaneityPolicy,
     bot: Bot,
 ):
-    bot_user = await bot.get_me()
+    bot_user = await get_bot_identity(bot)
 
     if _is_own_message(message, bot_user.id):
         return
 
     if message.chat.type != ChatType.PRIVATE and message.chat.type != "private":
-        await store_telegram_message(session, message)
-
-        try:
-            await session.commit()
-        except IntegrityError as exc:
-            await session.rollback()
+        async with _PERSIST_LOCKS.get(message.chat.id):
+            try:
+                created = await store_telegram_message(session, message)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+        if not created:
             logger.debug(
-                "Integrity error while persisting media chat=%s message_id=%s: %s",
+                "Duplicate media ignored chat=%s message_id=%s",
                 message.chat.id,
                 message.message_id,
-                exc,
             )
             return
-        except Exception:
-            await session.rollback()
-            raise
 
     conf = await settings.get_all(message.chat.id)
     if not conf.get("is_active", True):
@@ -442,21 +492,27 @@ async def handle_media_messages(
         )
         return
 
-    is_mention = _is_bot_mentioned(message, bot_user.id, bot_user.username)
-    is_reply_to_bot = _is_reply(message, bot_user.id, bot_user.username)
+    is_mention = _is_bot_mentioned(message, bot_user)
+    is_reply_to_bot = _is_reply(message, bot_user)
     if not _should_reply(is_mention, is_reply_to_bot, message.chat.type):
         if message.photo:
-            app_conf = await app_config.get_all()
-            max_turns = int(app_conf.get("context_max_turns", 100) or 100)
-            turns = await context.get_recent_turns(session, message.chat.id, max_turns)
             if await policy.can_interject(
                 message.chat.id, trigger=InterjectTrigger.NEW_MESSAGE
             ):
-                sent = await interjector.generate_spontaneous_reply(message, conf, turns)
+                app_conf = await app_config.get_all()
+                max_turns = int(app_conf.get("context_max_turns", 100) or 100)
+                turns = await context.get_recent_turns(session, message.chat.id, max_turns)
+                sent = await interjector.generate_spontaneous_reply(
+                    message, conf, turns, app_conf=app_conf
+                )
                 if sent:
                     await policy.mark_acted(
                         chat_id=message.chat.id, action=ActionKind.INTERJECT
                     )
+                else:
+                    await policy.release(
+                        chat_id=message.chat.id, action=ActionKind.INTERJECT
+                    )
         return
 
     if message.photo:
@@ -520,10 +576,9 @@ async def _handle_photo_reply(
     focus_text = None
     if raw_focus:
         cleaned = raw_focus
-        bot_user = await bot.get_me()
-        if bot_user.username:
-            pattern = re.compile(rf"@{re.escape(bot_user.username)}", re.IGNORECASE)
-            cleaned = pattern.sub("", cleaned)
+        bot_user = await get_bot_identity(bot)
+        if bot_user.mention_re is not None:
+            cleaned = bot_user.mention_re.sub("", cleaned)
         focus_text = " ".join(cleaned.split()) or None
 
     base_prompt = str(app_conf.get("prompt_chat_base") or DEFAULT_CHAT_PROMPT)
@@ -693,9 +748,9 @@ async def _handle_voice_message(
     except (TypeError, ValueError):
         duration_hint = 0.0
 
-    bot_user = await bot.get_me()
-    is_mention = _is_bot_mentioned(message, bot_user.id, bot_user.username)
-    is_reply_to_bot = _is_reply(message, bot_user.id, bot_user.username)
+    bot_user = await get_bot_identity(bot)
+    is_mention = _is_bot_mentioned(message, bot_user)
+    is_reply_to_bot = _is_reply(message, bot_user)
     is_addressed = _should_reply(is_mention, is_reply_to_bot, message.chat.type)
 
     if not bool(app_conf.get("voice_enabled", True)):
@@ -716,6 +771,7 @@ async def _handle_voice_message(
         if whisper_limit > 0:
             allowed, _counts, _ = await usage_limits.consume(chat_id, [("whisper", whisper_limit)])
             if not allowed:
+                await policy.release(chat_id=chat_id, action=ActionKind.INTERJECT)
                 return  # silent on interject path
 
         sent = None
@@ -728,6 +784,7 @@ async def _handle_voice_message(
                 language=whisper_language,
             )
             if result is None:
+                await policy.release(chat_id=chat_id, action=ActionKind.INTERJECT)
                 return  # silent on interject path
 
             await _cache_voice_transcript(session, chat_id, message.message_id, result.text, message)
@@ -737,10 +794,12 @@ async def _handle_voice_message(
             turns = await context.get_recent_turns(session, chat_id, max_turns)
 
             sent = await interjector.generate_spontaneous_reply(
-                message, conf, turns, focus_text_override=result.text,
+                message, conf, turns, focus_text_override=result.text, app_conf=app_conf,
             )
         if sent:
             await policy.mark_acted(chat_id=chat_id, action=ActionKind.INTERJECT)
+        else:
+            await policy.release(chat_id=chat_id, action=ActionKind.INTERJECT)
         return
 
     # ---- Direct address path ----
@@ -1040,8 +1099,8 @@ async def _generate_voice_direct_reply(
     # Reply-chain: if user replies to an OLD voice (not the current one) of a non-bot,
     # include that transcript for context.
     replied = getattr(message, "reply_to_message", None)
-    bot_user = await bot.get_me()
-    if replied is not None and not _is_reply_to_bot(replied, bot_user.id, bot_user.username):
+    bot_user = await get_bot_identity(bot)
+    if replied is not None and not _is_reply_to_bot(replied, bot_user):
         try:
             reply_transcript = await get_reply_voice_transcript(
                 bot=bot,
@@ -1121,7 +1180,7 @@ async def _generate_voice_direct_reply(
     if not reply_text:
         return False
 
-    bot_user = await bot.get_me()
+    bot_user = await get_bot_identity(bot)
     incoming_is_voice_reply_to_bot = (
         (message.voice is not None or message.video_note is not None)
         and message.reply_to_message is not None
@@ -1246,52 +1305,41 @@ def _is_own_message(message: types.Message, bot_id: int) -> bool:
     return False
 
 
-def _is_bot_mentioned(
-    message: types.Message,
-    bot_id: int,
-    bot_username: str | None,
-) -> bool:
+def _is_bot_mentioned(message: types.Message, bot: BotIdentity) -> bool:
     text = message.text or message.caption
-    if not text or not bot_username:
+    if not text or bot.mention_re is None:
         return False
 
-    bot_username = bot_username.lower()
-    entities = list(message.entities or []) + list(message.caption_entities or [])
-    for entity in entities:
-        if entity.type == MessageEntityType.TEXT_MENTION and getattr(entity, "user", None):
-            if entity.user.id == bot_id:
-                return True
-        if entity.type == MessageEntityType.MENTION:
-            mention_text = text[entity.offset : entity.offset + entity.length].lower()
-            if mention_text == f"@{bot_username}":
-                    return True
+    for entity in chain(message.entities or (), message.caption_entities or ()):
+        if entity.type != MessageEntityType.TEXT_MENTION:
+            continue
+        user = getattr(entity, "user", None)
+        if user is not None and user.id == bot.id:
+            return True
 
-    return f"@{bot_username}" in text.lower()
+    # TEXT_MENTION needs no "@" in the text, but a plain mention does.
+    if "@" not in text:
+        return False
+    return bot.mention_re.search(text) is not None
 
 
-def _is_reply_to_bot(replied: types.Message, bot_id: int, bot_username: str | None) -> bool:
-    if replied.from_user and replied.from_user.id == bot_id:
-        return True
-    if replied.from_user and bot_username and replied.from_user.username:
-        if replied.from_user.username.lower() == bot_username.lower():
-            return True
-    if replied.via_bot and replied.via_bot.id == bot_id:
-        return True
-    if replied.via_bot and bot_username and replied.via_bot.username:
-        if replied.via_bot.username.lower() == bot_username.lower():
+def _is_reply_to_bot(replied: types.Message, bot: BotIdentity) -> bool:
+    for attr in ("from_user", "via_bot", "sender_chat"):
+        candidate = getattr(replied, attr, None)
+        if candidate is None:
+            continue
+        if candidate.id == bot.id:
             return True
-    if replied.sender_chat and replied.sender_chat.id == bot_id:
-        return True
-    if replied.sender_chat and bot_username and replied.sender_chat.username:
-        if replied.sender_chat.username.lower() == bot_username.lower():
+        username = getattr(candidate, "username", None)
+        if bot.username_lower and username and username.lower() == bot.username_lower:
             return True
     return False
 
 
-def _is_reply(message: types.Message, bot_id: int, bot_username: str | None) -> bool:
+def _is_reply(message: types.Message, bot: BotIdentity) -> bool:
     if not message.reply_to_message:
         return False
-    return _is_reply_to_bot(message.reply_to_message, bot_id, bot_username)
+    return _is_reply_to_bot(message.reply_to_message, bot)
 
 
 def _should_reply(is_mention: bool, is_reply: bool, chat_type: ChatType | str | None) -> bool:
@@ -8,9 +8,37 @@ from sqlalchemy.ext.asyncio import (
 )
 
 
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return int(raw)
+    except ValueError as exc:
+        raise ValueError(f"Environment variable {name} must be an integer, got {raw!r}") from exc
+
+
+def _connect_args(url: str) -> dict[str, object]:
+    if not url.startswith("postgresql+asyncpg"):
+        return {}
+    # JIT only slows down the short catalog/introspection queries asyncpg runs per connection.
+    return {"server_settings": {"jit": "off", "application_name": "gremlin_bot"}}
+
+
 def init_engine_and_sessionmaker():
     url = os.getenv("DATABASE_URL", "postgresql+asyncpg://bot:bot@db:5432/botdb")
-    engine: AsyncEngine = create_async_engine(url, echo=False, future=True)
+    engine: AsyncEngine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        pool_size=_env_int("DB_POOL_SIZE", 20),
+        max_overflow=_env_int("DB_MAX_OVERFLOW", 40),
+        pool_recycle=_env_int("DB_POOL_RECYCLE", 1800),
+        pool_pre_ping=True,
+        # LIFO keeps a few hot connections busy and lets idle overflow age out via pool_recycle.
+        pool_use_lifo=True,
+        connect_args=_connect_args(url),
+    )
     sessionmaker: async_sessionmaker[AsyncSession] = async_sessionmaker(engine, expire_on_commit=False)
     return engine, sessionmaker
 
@@ -5,9 +5,14 @@ from redis.asyncio import Redis
 
 def init_redis() -> Redis:
     url = os.getenv("REDIS_URL", "redis://redis:6379/0")
-    return Redis.from_url(url)
+    return Redis.from_url(
+        url,
+        max_connections=int(os.getenv("REDIS_POOL_SIZE", "64")),
+        socket_keepalive=True,
+        # Ping connections idle for longer than this before reuse instead of failing on a stale socket.
+        health_check_interval=30,
+    )
 
 
 async def shutdown_redis(redis: Redis) -> None:
     await redis.close()
-
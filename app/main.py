@@ -16,8 +16,8 @@ from aiogram.types import (
     Update,
 )
 from fastapi import FastAPI, Header, HTTPException, Request
-from fastapi.responses import JSONResponse, PlainTextResponse
-from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, generate_latest
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Gauge, generate_latest
 from sqlalchemy import text
 
 try:
@@ -35,6 +35,7 @@ from .bot.router_games import router as games_router
 from .bot.router_games_extra import router as games_extra_router
 from .bot.router_interjector import router as interjector_router
 from .bot.router_spy import router as spy_router
+from .bot.router_triggers import get_bot_identity
 from .bot.router_triggers import router as triggers_router
 from .infra.db import init_engine_and_sessionmaker, shutdown_engine
 from .infra.redis import init_redis, shutdown_redis
@@ -48,6 +49,10 @@ from .services.games.storychain import StorychainService
 from .services.games.wordchain import WordchainService
 from .services.guess_game import GuessGameService
 from .services.interjector import InterjectorService
+from .services.llm.client import aclose_http_client as aclose_llm_http_client
+from .services.llm.client import resolve_llm_options
+from .services.llm.client import warmup as llm_warmup
+from .services.message_history import MessagePersister
 from .services.monthly_champion import MonthlyChampionService
 from .services.network_monitor import PROBE_INTERVAL_SECONDS, NetworkMonitorService
 from .services.persona import BASE_STYLE_DATA, StylePromptService
@@ -70,13 +75,14 @@ from .services.spy.types import SpyChannelInfo, SpyPostPayload
 from .services.usage_limits import UsageLimiter
 from .services.user_memory import UserMemoryService
 from .utils.logging import ensure_trace_level
-from .utils.proxy import get_proxy_url
+from .utils.metrics import LoopCounter
+from .utils.proxy import aclose_proxy_transport, get_proxy_url
 from .utils.version import get_version
 
 # Metrics
 registry = CollectorRegistry()
-METRIC_UPDATES = Counter("tg_updates_total", "Telegram updates received", registry=registry)
-METRIC_MESSAGES = Counter("bot_messages_total", "Messages sent by bot", registry=registry)
+METRIC_UPDATES = LoopCounter("tg_updates_total", "Telegram updates received", registry=registry)
+METRIC_MESSAGES = LoopCounter("bot_messages_total", "Messages sent by bot", registry=registry)
 
 
 def setup_logging():
@@ -109,6 +115,20 @@ def _env_int(name: str, default: int) -> int:
 
 PORT = _env_int("PORT", 8080)
 INTERJECT_TICK_SECONDS = _env_int("INTERJECT_TICK_SECONDS", 30)
+# Opt-in: pings the LLM provider every N seconds so the first /summary after a restart skips the cold start.
+LLM_WARMUP_SECONDS = _env_int("LLM_WARMUP_SECONDS", 0)
+
+
+class KeepAliveAiohttpSession(AiohttpSession):
+    """Bot API session that keeps idle connections to Telegram open longer than aiohttp's 15s."""
+
+    def __init__(self, *, keepalive_timeout: float = 75.0, **kwargs):
+        super().__init__(**kwargs)
+        # aiogram has no public connector option; fail at startup if its private kwargs dict moves.
+        connector_init = getattr(self, "_connector_init", None)
+        if not isinstance(connector_init, dict):
+            raise RuntimeError("AiohttpSession._connector_init is gone; update KeepAliveAiohttpSession")
+        connector_init["keepalive_timeout"] = keepalive_timeout
 
 
 class DisabledSpyReader:
@@ -123,13 +143,19 @@ class DisabledSpyReader:
 engine, async_sessionmaker = init_engine_and_sessionmaker()
 redis = init_redis()
 
+METRIC_DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "DB connections currently checked out of the pool", registry=registry
+)
+METRIC_DB_POOL_CHECKED_OUT.set_function(lambda: engine.pool.checkedout())
+METRIC_DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "DB connections opened beyond pool_size", registry=registry
+)
+METRIC_DB_POOL_OVERFLOW.set_function(lambda: max(0, engine.pool.overflow()))
+
 # Aiogram
 _proxy_url = get_proxy_url(prefer_plain=True)
-if _proxy_url:
-    bot_session = AiohttpSession(proxy=_proxy_url)
-    bot = Bot(token=BOT_TOKEN, session=bot_session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-else:
-    bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+bot_session = KeepAliveAiohttpSession(proxy=_proxy_url or None, limit=100)
+bot = Bot(token=BOT_TOKEN, session=bot_session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 dp = Dispatcher()
 
 # Services
@@ -138,6 +164,7 @@ context_service = ContextService()
 app_config_service = AppConfigService(async_sessionmaker, redis)
 persona_service = StylePromptService(async_sessionmaker, redis, BASE_STYLE_DATA)
 user_memory_service = UserMemoryService(async_sessionmaker)
+message_persister = MessagePersister(async_sessionmaker)
 usage_limits_service = UsageLimiter(redis, timezone=ZoneInfo("Europe/Moscow"))
 spontaneity_policy = SpontaneityPolicy(
     redis=redis,
@@ -154,6 +181,7 @@ reaction_service = ReactionService(
 roulette_service = RouletteService(
     bot=bot,
     sessionmaker=async_sessionmaker,
+    redis=redis,
     settings=settings_service,
     app_config=app_config_service,
     context=context_service,
@@ -279,6 +307,7 @@ interjector_service = InterjectorService(
     usage_limits=usage_limits_service,
     memory=user_memory_service,
     policy=spontaneity_policy,
+    persister=message_persister,
 )
 dp.update.middleware(
     ServicesMiddleware(
@@ -304,6 +333,7 @@ dp.update.middleware(
         rapbattle=rapbattle_service,
         storychain=storychain_service,
         spy_subscriptions=spy_subscription_service,
+        persister=message_persister,
     )
 )
 scheduler = get_scheduler()
@@ -330,6 +360,7 @@ app.include_router(
 app.state.polling_task = None
 app.state.scheduler = None
 app.state.webhook_tasks = set()
+app.state.persister_task = None
 
 
 def _track_background_task(task: asyncio.Task[None], *, label: str = "Background task") -> None:
@@ -372,6 +403,19 @@ async def _run_spy_tick() -> None:
         )
 
 
+async def _prewarm_caches() -> None:
+    # Fill the Redis and in-process caches so the first updates after a deploy skip the DB.
+    try:
+        await asyncio.gather(app_config_service.get_all(), persona_service.get_all())
+    except Exception:
+        logger.warning("Settings cache prewarm failed; continuing startup", exc_info=True)
+
+
+async def _run_llm_warmup() -> None:
+    app_conf = await app_config_service.get_all()
+    await llm_warmup(resolve_llm_options(app_conf))
+
+
 @app.on_event("startup")
 async def on_startup():
     if spy_telegram_client is not None:
@@ -381,7 +425,9 @@ async def on_startup():
         logger.warning("Gremlin Spy enabled but Telegram API credentials are not configured; public channel subscriptions are unavailable")
 
     await persona_service.ensure_defaults()
+    await _prewarm_caches()
     await configure_bot_commands(bot)
+    await get_bot_identity(bot)
     await _recover_stale_game_rounds()
 
     if PUBLIC_BASE_URL and not USE_POLLING:
@@ -463,6 +509,16 @@ async def on_startup():
         replace_existing=True,
         max_instances=1,
     )
+    if LLM_WARMUP_SECONDS > 0:
+        scheduler.add_job(
+            _run_llm_warmup,
+            "interval",
+            seconds=max(60, LLM_WARMUP_SECONDS),
+            id="llm_warmup",
+            replace_existing=True,
+            max_instances=1,
+        )
+        _track_background_task(asyncio.create_task(_run_llm_warmup()), label="LLM warmup")
     if spy_config.enabled:
         scheduler.add_job(
             _run_spy_tick,
@@ -473,6 +529,8 @@ async def on_startup():
             max_instances=1,
         )
     app.state.scheduler = scheduler
+    app.state.persister_task = asyncio.create_task(message_persister.run())
+    _track_background_task(app.state.persister_task, label="Message persister")
     _track_background_task(asyncio.create_task(network_monitor_service.probe_once()), label="Initial network probe")
     _track_background_task(
         asyncio.create_task(release_broadcaster.broadcast_if_new_version()),
@@ -500,13 +558,23 @@ async def on_shutdown():
     if sched:
         sched.shutdown(wait=False)
 
-    tasks = list(getattr(app.state, "webhook_tasks", set()))
+    # The persister is stopped cooperatively below so it can write the batch it holds.
+    persister_task = getattr(app.state, "persister_task", None)
+    tasks = [t for t in getattr(app.state, "webhook_tasks", set()) if t is not persister_task]
     for task in tasks:
         task.cancel()
     for task in tasks:
         with contextlib.suppress(asyncio.CancelledError):
             await task
 
+    if persister_task is not None and not persister_task.done():
+        await message_persister.stop()
+        await persister_task
+    await message_persister.flush()
+    await aclose_llm_http_client()
+    await aclose_proxy_transport()
+    await bot.session.close()
+
     if spy_telegram_client is not None:
         await spy_telegram_client.disconnect()
 
@@ -562,17 +630,21 @@ def verify_telegram_secret(header_value: Optional[str]):
         raise HTTPException(status_code=403, detail="Invalid secret token")
 
 
+# Telegram only looks at the status code; skip serialising the same body per update.
+_WEBHOOK_OK_BODY = b'{"ok":true}'
+
+
 @app.post("/webhook/telegram")
 async def telegram_webhook(
     request: Request,
     x_telegram_bot_api_secret_token: Optional[str] = Header(default=None, alias="X-Telegram-Bot-Api-Secret-Token"),
 ):
     verify_telegram_secret(x_telegram_bot_api_secret_token)
-    payload = await request.json()
     METRIC_UPDATES.inc()
-    update_obj = Update.model_validate(payload)
+    # pydantic-core parses the raw body directly, skipping the stdlib json -> dict pass.
+    update_obj = Update.model_validate_json(await request.body())
     _track_background_task(asyncio.create_task(_process_update_in_background(update_obj)), label="Telegram update")
-    return JSONResponse({"ok": True})
+    return Response(content=_WEBHOOK_OK_BODY, media_type="application/json")
 
 
 # Expose a small helper for handlers that want to increment metrics
@@ -1,3 +1,5 @@
+from sqlalchemy.orm import configure_mappers
+
 from .akinator_round import AkinatorQuestion, AkinatorRound
 from .app_setting import AppSetting
 from .chat import Chat, ChatSetting
@@ -48,3 +50,6 @@ __all__ = [
     "WordchainRound",
     "WordchainWord",
 ]
+
+# Resolve all mappers at import time instead of inside the first query of the process.
+configure_mappers()
@@ -6,7 +6,7 @@ from sqlalchemy import JSON, DateTime, String
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, utcnow
 
 
 class AppSetting(Base):
@@ -17,4 +17,4 @@ class AppSetting(Base):
         JSON().with_variant(JSONB, "postgresql"),
         nullable=True,
     )
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, onupdate=utcnow)
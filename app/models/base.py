@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+from datetime import datetime, timezone
+
 from sqlalchemy.orm import DeclarativeBase
 
 
 class Base(DeclarativeBase):
     pass
 
+
+def utcnow() -> datetime:
+    """Naive UTC timestamp, as stored in our ``timestamp without time zone`` columns."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -5,7 +5,7 @@ from datetime import datetime
 from sqlalchemy import JSON, BigInteger, Boolean, DateTime, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, utcnow
 
 
 class DiceRound(Base):
@@ -18,5 +18,5 @@ class DiceRound(Base):
     dice_value: Mapped[int] = mapped_column(Integer)
     won: Mapped[bool] = mapped_column(Boolean)
     delta: Mapped[int] = mapped_column(Integer)
-    rolled_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    rolled_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, index=True)
     dice_message_id: Mapped[int] = mapped_column(BigInteger)
@@ -5,7 +5,7 @@ from datetime import datetime
 from sqlalchemy import JSON, BigInteger, DateTime, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, utcnow
 
 
 class GuessRound(Base):
@@ -20,7 +20,7 @@ class GuessRound(Base):
     author_user_id: Mapped[int] = mapped_column(BigInteger)
     correct_option_id: Mapped[int] = mapped_column(Integer)
     option_user_ids: Mapped[list[int]] = mapped_column(JSON, default=list)
-    started_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, index=True)
     first_winner_user_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     first_winner_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     selection_mode: Mapped[str] = mapped_column(String(16), default="llm")
@@ -6,7 +6,7 @@ from sqlalchemy import JSON, BigInteger, DateTime, Float, Integer, String, Text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, utcnow
 
 
 class UserMemoryProfile(Base):
@@ -21,7 +21,7 @@ class UserMemoryProfile(Base):
     projects: Mapped[list[str]] = mapped_column(JSON().with_variant(JSONB, "postgresql"), default=list)
     memory_count: Mapped[int] = mapped_column(Integer, default=0)
     last_message_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, onupdate=utcnow)
 
 
 class RelationshipState(Base):
@@ -34,7 +34,7 @@ class RelationshipState(Base):
     tension: Mapped[float] = mapped_column(Float, default=0.0)
     tone_hint: Mapped[str | None] = mapped_column(String(32), nullable=True)
     last_interaction_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, onupdate=utcnow)
 
 
 class ChatMemory(Base):
@@ -51,5 +51,5 @@ class ChatMemory(Base):
         JSON().with_variant(JSONB, "postgresql"), nullable=True, default=None
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+        DateTime, default=utcnow, onupdate=utcnow
     )
@@ -3,6 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 
 from sqlalchemy import BigInteger, DateTime, Index, String, Text, UniqueConstraint
+from sqlalchemy import text as sa_text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -13,10 +14,11 @@ class Message(Base):
     __table_args__ = (
         UniqueConstraint("chat_id", "message_id", name="uq_messages_chat_message"),
         Index("ix_messages_chat_media_group", "chat_id", "media_group_id"),
+        Index("ix_messages_chat_date", "chat_id", sa_text("date DESC")),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    chat_id: Mapped[int] = mapped_column(BigInteger, index=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger)
     message_id: Mapped[int] = mapped_column(BigInteger)
     user_id: Mapped[int] = mapped_column(BigInteger, index=True)
     text: Mapped[str] = mapped_column(Text)
@@ -2,15 +2,34 @@ from __future__ import annotations
 
 from datetime import date, datetime
 
-from sqlalchemy import BigInteger, Date, DateTime, Integer, String, UniqueConstraint
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    false,
+)
+from sqlalchemy import text as sa_text
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, utcnow
 
 
 class RouletteWinner(Base):
     __tablename__ = "roulette_winners"
-    __table_args__ = (UniqueConstraint("chat_id", "won_at", name="uq_roulette_winners_chat_day"),)
+    __table_args__ = (
+        UniqueConstraint("chat_id", "won_at", name="uq_roulette_winners_chat_day"),
+        Index(
+            "ix_roulette_winners_chat_date_cover",
+            "chat_id",
+            "won_at",
+            postgresql_include=["user_id", "username"],
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     chat_id: Mapped[int] = mapped_column(BigInteger, index=True)
@@ -19,18 +38,29 @@ class RouletteWinner(Base):
     title_code: Mapped[str] = mapped_column(String(64))
     title: Mapped[str] = mapped_column(String(255))
     won_at: Mapped[date] = mapped_column(Date)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow)
 
 
 class RouletteParticipant(Base):
     __tablename__ = "roulette_participants"
-    __table_args__ = (UniqueConstraint("chat_id", "user_id", name="uq_roulette_participants_chat_user"),)
+    __table_args__ = (
+        UniqueConstraint("chat_id", "user_id", name="uq_roulette_participants_chat_user"),
+        Index(
+            "ix_roulette_participants_chat_humans",
+            "chat_id",
+            postgresql_where=sa_text("NOT is_bot"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     chat_id: Mapped[int] = mapped_column(BigInteger, index=True)
     user_id: Mapped[int] = mapped_column(BigInteger, index=True)
     username: Mapped[str | None] = mapped_column(String(255), nullable=True)
-    registered_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Legacy flag: the is_bot migration backfilled it for bot-like usernames stored before
+    # register_participant started rejecting them. New rows are never bot-like, and a
+    # re-registration under a normal name clears it.
+    is_bot: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
+    registered_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow)
 
 
 class RouletteScoreAdjustment(Base):
@@ -42,4 +72,4 @@ class RouletteScoreAdjustment(Base):
     delta: Mapped[int] = mapped_column(Integer)
     reason: Mapped[str] = mapped_column(String(32))
     source_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=utcnow, index=True)
@@ -6,7 +6,7 @@ from sqlalchemy import JSON, BigInteger, DateTime, Integer, Text, UniqueConstrai
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
-from .base import Base
+from .base import Base, utcnow
 
 
 class ShipResult(Base):
@@ -28,5 +28,5 @@ class ShipResult(Base):
     )
     rendered_text: Mapped[str] = mapped_column(Text, nullable=False, default="")
     computed_at: Mapped[datetime] = mapped_column(
-        DateTime, default=datetime.utcnow, index=True, nullable=False
+        DateTime, default=utcnow, index=True, nullable=False
     )
@@ -3,10 +3,14 @@ from __future__ import annotations
 import json
 from typing import Any, Dict, Protocol
 
+from pydantic_core import to_json
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from ..models.app_setting import AppSetting
+from ..models.base import utcnow
+from ..utils.cache import TTLCache
+from ..utils.sql import dialect_insert
 
 
 class AppConfigCache(Protocol):
@@ -72,31 +76,46 @@ class AppConfigService:
         self._sessionmaker = sessionmaker
         self._redis = redis
         self._cache_key = "app:settings"
+        self._local: TTLCache[str, Dict[str, Any]] = TTLCache(ttl=60, maxsize=1)
 
     async def get_all(self) -> Dict[str, Any]:
+        return dict(await self._load())
+
+    async def get(self, key: str) -> Any:
+        values = await self._load()
+        return values.get(key, APP_CONFIG_DEFAULTS.get(key))
+
+    async def _load(self) -> Dict[str, Any]:
+        # Returns the shared cached dict; callers outside this class only ever see copies.
+        local = self._local.get(self._cache_key)
+        if local is not None:
+            return local
+
         cached = await self._redis.get(self._cache_key)
         if cached is not None:
-            return json.loads(cached)
+            data: Dict[str, Any] = json.loads(cached)
+            self._local.set(self._cache_key, data)
+            return data
 
         async with self._sessionmaker() as session:
             res = await session.execute(select(AppSetting))
             data = {row.key: row.value for row in res.scalars()}
 
         merged = APP_CONFIG_DEFAULTS | data
-        await self._redis.set(self._cache_key, json.dumps(merged, ensure_ascii=False), ex=300)
+        await self._redis.set(self._cache_key, to_json(merged), ex=300)
+        self._local.set(self._cache_key, merged)
         return merged
 
-    async def get(self, key: str) -> Any:
-        values = await self.get_all()
-        return values.get(key, APP_CONFIG_DEFAULTS.get(key))
-
     async def set(self, key: str, value: Any) -> None:
         async with self._sessionmaker() as session:
-            obj = await session.get(AppSetting, key)
-            if obj is None:
-                obj = AppSetting(key=key, value=value)
-                session.add(obj)
-            else:
-                obj.value = value
+            stmt = dialect_insert(session, AppSetting).values(
+                key=key, value=value, updated_at=utcnow()
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AppSetting.key],
+                set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at},
+            )
+            await session.execute(stmt)
             await session.commit()
+        self._local.pop(self._cache_key)
         await self._redis.delete(self._cache_key)
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
-import math
+import re
+from collections import deque
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Iterable, List, Mapping, Sequence, TypedDict, cast
 
 from sqlalchemy import select
@@ -9,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.message import Message
 from ..models.user import User
+from ..utils.cache import TTLCache
 from .persona import DEFAULT_STYLE_KEY, DEFAULT_STYLE_PROMPTS
 
 DEFAULT_CHAT_PROMPT = (
@@ -21,6 +24,55 @@ DEFAULT_INTERJECT_SUFFIX = "Отвечай без приглашения, ост
 
 DEFAULT_FOCUS_SUFFIX = 'Вопрос: "{question}". Ответь одним сообщением.'
 
+_FOCUS_TRANSLATION = str.maketrans({"\n": " ", '"': "'"})
+
+
+_SERVICE_TEXT_MAX_LEN = 160
+
+_SERVICE_MARKERS = (
+    " joined the group",
+    " joined the chat",
+    " left the group",
+    " left the chat",
+    " pinned a message",
+    " changed the chat photo",
+    " changed the chat title",
+    " changed the group name",
+    " changed the group photo",
+    " set the chat photo",
+    "пригласил в чат",
+    "пригласила в чат",
+    "добавил в чат",
+    "добавила в чат",
+    "вступил в чат",
+    "вступила в чат",
+    "вышел из чата",
+    "вышла из чата",
+    "закрепил сообщение",
+    "закрепила сообщение",
+    "сообщение закреплено",
+    "изменил название чата",
+    "изменил(а) название чата",
+    "обновил фото чата",
+    "обновила фото чата",
+    "удалил из чата",
+    "удалила из чата",
+)
+
+# One pass over the lowered text instead of a chain of substring checks per turn.
+_SERVICE_TEXT_RE = re.compile(
+    "|".join(
+        [
+            *(re.escape(marker) for marker in _SERVICE_MARKERS),
+            r" was pinned$",
+            r"^(?=.* joined via )(?=.*(?:invite|ссылк))",
+            r"^(?=.*(?: invited | added ))(?=.*(?: to the chat| to the group| в чат))",
+            r"^(?=.*(?: removed | kicked ))(?=.*(?: from the chat| from the group))",
+        ]
+    ),
+    re.DOTALL,
+)
+
 
 @dataclass(frozen=True, slots=True)
 class ChatTurn:
@@ -45,6 +97,10 @@ class CombinedHistoryEntry(TypedDict):
 class ContextService:
     """Мининструмент для выборки последних сообщений из чата."""
 
+    def __init__(self) -> None:
+        # user_id -> display name; usernames change rarely, so skip the users join on warm chats.
+        self._names: TTLCache[int | None, str] = TTLCache(ttl=300, maxsize=20_000)
+
     async def get_recent_turns(
         self,
         session: AsyncSession,
@@ -52,19 +108,56 @@ class ContextService:
         limit: int,
     ) -> List[ChatTurn]:
         stmt = (
-            select(Message, User)
-            .outerjoin(User, User.tg_id == Message.user_id)
+            select(Message.user_id, Message.text, Message.is_bot)
             .where(Message.chat_id == chat_id)
             .order_by(Message.date.desc())
             .limit(limit)
         )
         res = await session.execute(stmt)
-        rows = cast(Sequence[tuple[Message, User | None]], res.all())
-        turns: List[ChatTurn] = []
-        for msg, user in reversed(rows):
-            speaker = _resolve_name(user, msg.user_id)
-            turns.append(ChatTurn(speaker, msg.user_id, msg.text or "", bool(msg.is_bot)))
-        return turns
+        rows = cast(Sequence[tuple[int | None, str | None, bool | None]], res.all())
+
+        names: dict[int | None, str] = {}
+        missing: set[int] = set()
+        for user_id, _text, _is_bot in rows:
+            if user_id in names:
+                continue
+            cached = self._names.get(user_id)
+            if cached is not None:
+                names[user_id] = cached
+            elif user_id:
+                missing.add(user_id)
+            else:
+                names[user_id] = "unknown"
+        if missing:
+            users = await session.execute(
+                select(User.tg_id, User.username).where(User.tg_id.in_(missing))
+            )
+            usernames: dict[int, str | None] = {tg_id: username for tg_id, username in users.all()}
+            for user_id in missing:
+                names[user_id] = usernames.get(user_id) or str(user_id)
+                self._names.set(user_id, names[user_id])
+
+        return [
+            ChatTurn(names[user_id], user_id, text or "", bool(is_bot))
+            for user_id, text, is_bot in reversed(rows)
+        ]
+
+
+def _collapse_whitespace(text: str) -> str:
+    # isprintable() rules out every whitespace char except the ASCII space, so most
+    # chat lines are already normalised and skip the split/join copy.
+    if text.isprintable() and "  " not in text and text[:1] != " " and text[-1:] != " ":
+        return text
+    return " ".join(text.split())
+
+
+def _estimate_tokens(text: str) -> int:
+    # Простая оценка, чтобы не превышать окно модели (≈4 символа на токен)
+    return (len(text) + 3) >> 2 or 1
+
+
+def _history_line(combined_entry: CombinedHistoryEntry) -> str:
+    return f"{combined_entry['speaker'] or 'unknown'}: {' '.join(combined_entry['texts'])}"
 
 
 def build_messages(
@@ -75,49 +168,6 @@ def build_messages(
     closing_text: str | None = None,
     context_blocks: Iterable[str] | None = None,
 ) -> list[dict[str, Any]]:
-    def _estimate_tokens(text: str) -> int:
-        # Простая оценка, чтобы не превышать окно модели (≈4 символа на токен)
-        return max(1, math.ceil(len(text) / 4))
-
-    def _is_service_text(text: str) -> bool:
-        lowered = text.lower()
-        if any(kw in lowered for kw in (" joined the group", " joined the chat", " left the group", " left the chat")):
-            return len(text) <= 160
-        if " joined via " in lowered and ("invite" in lowered or "ссылк" in lowered):
-            return len(text) <= 160
-        if " pinned a message" in lowered or lowered.endswith(" was pinned"):
-            return len(text) <= 160
-        if any(kw in lowered for kw in (" changed the chat photo", " changed the chat title", " changed the group name", " changed the group photo", " set the chat photo")):
-            return len(text) <= 160
-        if (" invited " in lowered or " added " in lowered) and (
-            " to the chat" in lowered or " to the group" in lowered or " в чат" in lowered
-        ):
-            return len(text) <= 160
-        if (" removed " in lowered or " kicked " in lowered) and (" from the chat" in lowered or " from the group" in lowered):
-            return len(text) <= 160
-        ru_markers = (
-            "пригласил в чат",
-            "пригласила в чат",
-            "добавил в чат",
-            "добавила в чат",
-            "вступил в чат",
-            "вступила в чат",
-            "вышел из чата",
-            "вышла из чата",
-            "закрепил сообщение",
-            "закрепила сообщение",
-            "сообщение закреплено",
-            "изменил название чата",
-            "изменил(а) название чата",
-            "обновил фото чата",
-            "обновила фото чата",
-            "удалил из чата",
-            "удалила из чата",
-        )
-        if any(marker in lowered for marker in ru_markers):
-            return len(text) <= 160
-        return False
-
     system_content = system_prompt.strip()
     msgs: list[dict[str, Any]] = [{"role": "system", "content": system_content}]
     tokens_budget = _estimate_tokens(system_content)
@@ -129,16 +179,14 @@ def build_messages(
         msgs.append({"role": "user", "content": clean_block})
         tokens_budget += _estimate_tokens(clean_block)
 
-    tail = list(turns)[-max_turns:]
+    # Bounded tail buffer: never holds more than max_turns turns, whatever the input size.
+    tail = deque(turns, maxlen=max_turns) if max_turns > 0 else list(turns)[-max_turns:]
     entries: list[HistoryEntry] = []
     for turn in tail:
-        raw = (turn.text or "").strip()
-        if not raw:
-            continue
-        sanitized = " ".join(raw.replace("\n", " ").split())
+        sanitized = _collapse_whitespace(turn.text or "")
         if not sanitized:
             continue
-        if sanitized.lstrip().startswith("/"):
+        if sanitized.startswith("/"):
             continue
         if _is_service_text(sanitized):
             continue
@@ -192,31 +240,24 @@ def build_messages(
                 }
             )
 
-    history_lines_raw: list[str] = []
-    for combined_entry in combined:
-        speaker = str(combined_entry["speaker"] or "unknown")
-        text = " ".join(combined_entry["texts"])
-        history_lines_raw.append(f"{speaker}: {text}")
-
     history_header = "История:"
     placeholder = "(пусто)"
     available_for_history = None
+    history_lines: deque[str] = deque()
     if max_tokens:
         available_for_history = max_tokens - tokens_budget - final_tokens
-        if available_for_history <= 0:
-            history_lines = []
-        else:
+        if available_for_history > 0:
+            # Walk newest-first and stop as soon as the budget is spent.
             total = _estimate_tokens(history_header)
-            selected: list[str] = []
-            for line in reversed(history_lines_raw):
+            for combined_entry in reversed(combined):
+                line = _history_line(combined_entry)
                 tokens_line = _estimate_tokens(line)
                 if total + tokens_line > available_for_history:
                     break
-                selected.append(line)
+                history_lines.appendleft(line)
                 total += tokens_line
-            history_lines = list(reversed(selected))
     else:
-        history_lines = history_lines_raw
+        history_lines.extend(_history_line(combined_entry) for combined_entry in combined)
 
     if history_lines:
         history_content = history_header + "\n" + "\n".join(history_lines)
@@ -234,12 +275,26 @@ def build_messages(
     return msgs
 
 
-def _resolve_name(user: User | None, user_id: int | None) -> str:
-    if user and user.username:
-        return user.username
-    if user_id:
-        return str(user_id)
-    return "unknown"
+def _is_service_text(text: str) -> bool:
+    if len(text) > _SERVICE_TEXT_MAX_LEN:
+        return False
+    return _SERVICE_TEXT_RE.search(text.lower()) is not None
+
+
+@lru_cache(maxsize=256)
+def _compose_prompt_base(base_prompt: str, style_block: str, interject_suffix: str | None) -> str:
+    # Everything except the focus question is identical across a chat's messages.
+    base_parts = [base_prompt.strip()]
+    style_clean = style_block.strip()
+    if style_clean:
+        base_parts.append(style_clean)
+    base = "\n\n".join(base_parts) + "\n"
+
+    if interject_suffix is not None:
+        suffix = interject_suffix.strip()
+        if suffix:
+            base += "\n" + suffix
+    return base
 
 
 def build_system_prompt(
@@ -260,19 +315,14 @@ def build_system_prompt(
     )
     style_block = prompts.get(style, default_prompt)
 
-    base_parts = [(base_prompt or DEFAULT_CHAT_PROMPT).strip()]
-    style_clean = style_block.strip()
-    if style_clean:
-        base_parts.append(style_clean)
-    base = "\n\n".join(base_parts) + "\n"
-
-    if interject:
-        suffix = (interject_suffix or DEFAULT_INTERJECT_SUFFIX).strip()
-        if suffix:
-            base += "\n" + suffix
+    base = _compose_prompt_base(
+        base_prompt or DEFAULT_CHAT_PROMPT,
+        style_block,
+        (interject_suffix or DEFAULT_INTERJECT_SUFFIX) if interject else None,
+    )
 
     if focus_text:
-        sanitized = focus_text.strip().replace("\n", " ").replace('"', "'")
+        sanitized = focus_text.strip().translate(_FOCUS_TRANSLATION)
         if len(sanitized) > 400:
             sanitized = sanitized[:400] + "…"
         suffix_tpl = (focus_suffix or DEFAULT_FOCUS_SUFFIX).strip()
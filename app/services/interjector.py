@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import io
 import logging
@@ -11,7 +12,7 @@ from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.types import Message as TgMessage
 from redis.asyncio import Redis
-from sqlalchemy import desc, select
+from sqlalchemy import desc, func, select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from ..bot.typing_indicator import keep_typing
@@ -34,7 +35,7 @@ from ..services.llm.client import (
     generate as llm_generate,
     resolve_llm_options,
 )
-from ..services.message_history import persist_telegram_message
+from ..services.message_history import MessagePersister, persist_telegram_message
 from ..services.moderation import apply_moderation
 from ..services.settings import SettingsService
 from ..services.app_config import AppConfigService
@@ -48,6 +49,9 @@ logger = logging.getLogger("interjector")
 
 DEFAULT_REVIVE_CLOSING = "В чате тихо. Напиши короткое сообщение, чтобы оживить разговор."
 
+# Revives run in parallel, each on its own session; keep well below DB_POOL_SIZE.
+_REVIVE_CONCURRENCY = 8
+
 
 class InterjectorService:
     def __init__(
@@ -63,6 +67,7 @@ class InterjectorService:
         usage_limits: UsageLimiter,
         memory: UserMemoryService,
         policy: SpontaneityPolicy,
+        persister: MessagePersister | None = None,
     ) -> None:
         self.bot = bot
         self.settings = settings
@@ -74,6 +79,7 @@ class InterjectorService:
         self.usage_limits = usage_limits
         self.memory = memory
         self.policy = policy
+        self.persister = persister
 
     async def generate_spontaneous_reply(
         self,
@@ -82,8 +88,10 @@ class InterjectorService:
         turns: list[ChatTurn],
         *,
         focus_text_override: str | None = None,
+        app_conf: dict[str, object] | None = None,
     ) -> bool:
-        app_conf = await self.app_config.get_all()
+        if app_conf is None:
+            app_conf = await self.app_config.get_all()
 
         if focus_text_override is not None:
             stripped_override = focus_text_override.strip()
@@ -145,11 +153,7 @@ class InterjectorService:
             if sent_reply is None:
                 return False
         try:
-            await persist_telegram_message(
-                self.sessionmaker,
-                sent_reply,
-                reply_to_message_id=message.message_id,
-            )
+            await self._persist_sent(sent_reply, reply_to_message_id=message.message_id)
         except Exception:
             logger.exception(
                 "Failed to persist spontaneous reply chat=%s source_message=%s reply_message=%s",
@@ -179,33 +183,76 @@ class InterjectorService:
         now = datetime.utcnow()
         app_conf = await self.app_config.get_all()
         async with self.sessionmaker() as session:
-            result = await session.execute(select(Chat).where(Chat.is_active.is_(True)))
-            chats = list(result.scalars())
-            for chat in chats:
-                if not self._is_group_chat(chat.id):
-                    logger.debug("Skip idle revival for non-group chat %s", chat.id)
-                    continue
-                if not await self.policy.can_interject(chat.id, trigger=InterjectTrigger.REVIVE):
+            # Telegram group/supergroup ids are negative; private chats never get revives.
+            # Server-side cursor: only chats that pass the settings filter are kept around.
+            chats = await session.stream_scalars(
+                select(Chat)
+                .where(Chat.is_active.is_(True), Chat.id < 0)
+                .execution_options(yield_per=500)
+            )
+            candidates: dict[int, Chat] = {}
+            confs: dict[int, dict[str, object]] = {}
+            thresholds: dict[int, timedelta] = {}
+            async for chat in chats:
+                # Chat settings are cached in-process; rule out disabled chats before the Redis checks.
+                conf = await self.settings.get_all(chat.id)
+                if not conf.get("is_active", True) or not conf.get("revive_enabled", False):
                     continue
+                candidates[chat.id] = chat
+                confs[chat.id] = conf
+                hours = int(conf.get("revive_after_hours", 48) or 48)
+                thresholds[chat.id] = timedelta(hours=max(1, hours))
+
+            # One query for every candidate's last message; only chats quiet for long enough go on.
+            last_times = await self._get_last_message_times(session, list(candidates))
+            for chat_id in list(candidates):
+                if now - (last_times.get(chat_id) or datetime.min) < thresholds[chat_id]:
+                    del candidates[chat_id]
+
+        allowed = await self.policy.interject_candidates(
+            list(candidates), trigger=InterjectTrigger.REVIVE
+        )
+        if not allowed:
+            return
+
+        semaphore = asyncio.Semaphore(_REVIVE_CONCURRENCY)
+
+        async def _revive(chat: Chat) -> None:
+            async with semaphore:
                 try:
-                    sent = await self.generate_revive(session, chat, now, app_conf)
+                    async with self.sessionmaker() as chat_session:
+                        sent = await self.generate_revive(
+                            chat_session,
+                            chat,
+                            now,
+                            app_conf,
+                            conf=confs[chat.id],
+                            last_time=last_times.get(chat.id),
+                        )
                     if sent:
                         await self.policy.mark_acted(chat_id=chat.id, action=ActionKind.INTERJECT)
+                    else:
+                        await self.policy.release(chat_id=chat.id, action=ActionKind.INTERJECT)
                 except Exception:
                     logger.exception("Idle revival failed for chat %s", chat.id)
 
+        await asyncio.gather(*(_revive(candidates[chat_id]) for chat_id in allowed))
+
     async def generate_revive(
         self,
         session: AsyncSession,
         chat: Chat,
         now: datetime,
         app_conf: dict[str, object],
+        *,
+        conf: dict[str, object],
+        last_time: datetime | None,
     ) -> bool:
+        """Post a revive into ``chat``; ``conf`` and ``last_time`` come from the batched sweep."""
         if not self._is_group_chat(chat.id):
             logger.debug("Skip revive attempt for non-group chat %s", chat.id)
             return False
 
-        conf = await self.settings.get_all(chat.id)
         if not conf.get("is_active", True):
             return False
         if not conf.get("revive_enabled", False):
@@ -213,20 +260,19 @@ class InterjectorService:
 
         hours = int(conf.get("revive_after_hours", 48) or 48)
         threshold = timedelta(hours=max(1, hours))
-
-        last_time = await self._get_last_message_time(session, chat.id)
-        if last_time is None:
-            last_time = datetime.min
-
-        if now - last_time < threshold:
+        if now - (last_time or datetime.min) < threshold:
             return False
 
-        if not await self._consume_llm_budget(chat.id, app_conf):
+        # Independent DB/Redis reads; overlap them instead of awaiting in turn.
+        budget_ok, turns, style_prompts = await asyncio.gather(
+            self._consume_llm_budget(chat.id, app_conf),
+            self.context.get_recent_turns(session, chat.id, 50),
+            self.personas.get_all(),
+        )
+        if not budget_ok:
             logger.debug("LLM limit reached for chat %s during revive check", chat.id)
             return False
 
-        turns = await self.context.get_recent_turns(session, chat.id, 50)
-        style_prompts = await self.personas.get_all()
         base_prompt = str(app_conf.get("prompt_chat_base") or DEFAULT_CHAT_PROMPT)
         system_prompt = build_system_prompt(
             conf,
@@ -304,7 +350,7 @@ class InterjectorService:
             if sent_reply is None:
                 return False
         try:
-            await persist_telegram_message(self.sessionmaker, sent_reply)
+            await self._persist_sent(sent_reply)
         except Exception:
             logger.exception(
                 "Failed to persist idle revival chat=%s reply_message=%s",
@@ -315,6 +361,18 @@ class InterjectorService:
         logger.info("Idle revival sent to chat %s", chat.id)
         return True
 
+    async def _persist_sent(self, sent: TgMessage, *, reply_to_message_id: int | None = None) -> None:
+        # Sent messages are only history; let the persister group-commit them when available.
+        if self.persister is not None and self.persister.enqueue(
+            sent, reply_to_message_id=reply_to_message_id
+        ):
+            return
+        await persist_telegram_message(
+            self.sessionmaker,
+            sent,
+            reply_to_message_id=reply_to_message_id,
+        )
+
     async def _deactivate_chat(self, chat_id: int) -> None:
         async with self.sessionmaker() as session:
             chat = await session.get(Chat, chat_id)
@@ -354,6 +412,25 @@ class InterjectorService:
         row = result.scalar_one_or_none()
         return row
 
+    async def _get_last_message_times(
+        self, session: AsyncSession, chat_ids: list[int]
+    ) -> dict[int, datetime | None]:
+        """Batch form of :meth:`_get_last_message_time` (same any-sender semantics).
+
+        A correlated MAX per chat lets Postgres answer each one from the
+        (chat_id, date) index instead of aggregating the whole chat history.
+        """
+        if not chat_ids:
+            return {}
+        last_date = (
+            select(func.max(DBMessage.date))
+            .where(DBMessage.chat_id == Chat.id)
+            .correlate(Chat)
+            .scalar_subquery()
+        )
+        result = await session.execute(select(Chat.id, last_date).where(Chat.id.in_(chat_ids)))
+        return {chat_id: last for chat_id, last in result.all()}
+
     async def _generate_reply(
         self,
         conf: dict[str, object],
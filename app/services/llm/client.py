@@ -1,14 +1,18 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 import os
+import random
+import time
+from functools import lru_cache
 from typing import Iterable, Mapping, Sequence
 
 import httpx
+from pydantic_core import to_json
 
 from ...utils.logging import TRACE_LEVEL
-from ...utils.proxy import get_proxy_display, httpx_client_kwargs
+from ...utils.proxy import POOL_LIMITS, get_proxy_display, httpx_client_kwargs
 
 
 logger = logging.getLogger(__name__)
@@ -31,6 +35,24 @@ OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
 OPENAI_ORG = os.getenv("OPENAI_ORG")
 OPENAI_PROJECT = os.getenv("OPENAI_PROJECT")
 
+# Endpoints and headers only depend on the environment; build them once, not per request.
+_OPENROUTER_URL = f"{OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
+_OPENROUTER_HEADERS = {
+    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+    "Content-Type": "application/json",
+    "HTTP-Referer": OPENROUTER_APP_URL,
+    "X-Title": OPENROUTER_APP_NAME,
+}
+_OPENAI_URL = f"{OPENAI_API_BASE.rstrip('/')}/chat/completions"
+_OPENAI_HEADERS = {
+    "Authorization": f"Bearer {OPENAI_API_KEY}",
+    "Content-Type": "application/json",
+}
+if OPENAI_ORG:
+    _OPENAI_HEADERS["OpenAI-Organization"] = OPENAI_ORG
+if OPENAI_PROJECT:
+    _OPENAI_HEADERS["OpenAI-Project"] = OPENAI_PROJECT
+
 
 class LLMError(RuntimeError):
     """Base error raised while talking to an LLM provider."""
@@ -48,6 +70,49 @@ class LLMRateLimitError(LLMError):
         self.retry_after = retry_after
 
 
+_HTTP_LIMITS = POOL_LIMITS
+_http_client: httpx.AsyncClient | None = None
+_http_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Return the shared client so LLM calls reuse pooled TLS connections."""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(**httpx_client_kwargs(timeout=60, limits=_HTTP_LIMITS))
+        _http_client_loop = loop
+    return _http_client
+
+
+async def aclose_http_client() -> None:
+    global _http_client, _http_client_loop
+    client, _http_client, _http_client_loop = _http_client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+# 429 handling: short waits are retried in place with jittered backoff; a longer
+# Retry-After blocks the provider locally so callers go straight to the fallback
+# instead of hammering it.
+_RATE_LIMIT_RETRIES = 2
+_RATE_LIMIT_MAX_WAIT = 3.0
+_RATE_LIMIT_BACKOFF = 0.5
+_rate_limited_until: dict[str, float] = {}
+
+
+def _rate_limit_delay(retry_after: float | None, attempt: int) -> float:
+    backoff = _RATE_LIMIT_BACKOFF * 2**attempt + random.random() * _RATE_LIMIT_BACKOFF
+    return max(retry_after or 0.0, backoff)
+
+
+def _truncate(text: str, limit: int = 512) -> str:
+    # Proxy error pages can be huge; keep exception messages short, the log has the body.
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...<{len(text) - limit} more chars>"
+
+
 def _parse_retry_after(value: str | None) -> float | None:
     if not value:
         return None
@@ -60,6 +125,7 @@ def _parse_retry_after(value: str | None) -> float | None:
         return None
 
 
+@lru_cache(maxsize=16)
 def _normalize_provider(provider: str | None) -> str:
     if not provider:
         return DEFAULT_PROVIDER
@@ -69,21 +135,17 @@ def _normalize_provider(provider: str | None) -> str:
     return value
 
 
-def _log_payload(label: str, payload: dict[str, object]) -> None:
-    if not logger.isEnabledFor(TRACE_LEVEL):
-        return
-    try:
-        serialized = json.dumps(payload, ensure_ascii=False)
-        logger.log(TRACE_LEVEL, "%s payload: %s", label, serialized)
-    except Exception:
-        logger.log(TRACE_LEVEL, "%s payload (repr): %r", label, payload)
+def _log_payload(label: str, body: bytes) -> None:
+    # Logs the already-encoded request body rather than serialising the payload again.
+    if logger.isEnabledFor(TRACE_LEVEL):
+        logger.log(TRACE_LEVEL, "%s payload: %s", label, body.decode())
 
 
 def _log_response(label: str, payload: object) -> None:
     if not logger.isEnabledFor(TRACE_LEVEL):
         return
     try:
-        serialized = json.dumps(payload, ensure_ascii=False)
+        serialized = to_json(payload).decode()
         logger.log(TRACE_LEVEL, "%s response: %s", label, serialized)
     except Exception:
         logger.log(TRACE_LEVEL, "%s response (repr): %r", label, payload)
@@ -136,13 +198,21 @@ async def _post_json(
     headers: dict[str, str],
     payload: dict[str, object],
 ) -> dict[str, object]:
-    _log_payload(label, payload)
-
-    client_kwargs = httpx_client_kwargs(timeout=60)
-    async with httpx.AsyncClient(**client_kwargs) as client:
+    blocked_for = _rate_limited_until.get(label, 0.0) - time.monotonic()
+    if blocked_for > 0:
+        raise LLMRateLimitError(f"{label} rate limited", retry_after=blocked_for)
+
+    # pydantic-core's native encoder is several times faster than httpx's json.dumps
+    # for long message histories; callers already send Content-Type: application/json.
+    body = to_json(payload)
+    _log_payload(label, body)
+    client = _get_http_client()
+    attempt = 0
+    while True:
         try:
-            response = await client.post(url, headers=headers, json=payload)
+            response = await client.post(url, headers=headers, content=body)
             response.raise_for_status()
+            break
         except httpx.HTTPStatusError as exc:
             status = exc.response.status_code
             text = exc.response.text
@@ -150,6 +220,19 @@ async def _post_json(
                 retry_after = _parse_retry_after(
                     exc.response.headers.get("Retry-After")
                 )
+                delay = _rate_limit_delay(retry_after, attempt)
+                if attempt < _RATE_LIMIT_RETRIES and delay <= _RATE_LIMIT_MAX_WAIT:
+                    logger.info(
+                        "%s rate limit hit (retry_after=%s); retrying in %.2fs",
+                        label,
+                        retry_after,
+                        delay,
+                    )
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    continue
+                if retry_after:
+                    _rate_limited_until[label] = time.monotonic() + retry_after
                 logger.warning(
                     "%s rate limit hit (retry_after=%s, body=%s)",
                     label,
@@ -157,11 +240,13 @@ async def _post_json(
                     text,
                 )
                 raise LLMRateLimitError(
-                    text or "rate limit",
+                    _truncate(text) or "rate limit",
                     retry_after=retry_after,
                 ) from exc
             logger.error("%s request failed status=%s body=%s", label, status, text)
-            raise LLMError(f"{label} request failed: {status} {text}", status_code=status) from exc
+            raise LLMError(
+                f"{label} request failed: {status} {_truncate(text)}", status_code=status
+            ) from exc
         except httpx.HTTPError as exc:
             proxy_hint = get_proxy_display()
             if proxy_hint:
@@ -184,7 +269,7 @@ def _extract_openrouter_content(data: Mapping[str, object]) -> str:
     try:
         content = _flatten_message_content(data["choices"][0]["message"]["content"])
     except (KeyError, IndexError, TypeError) as exc:
-        raise LLMError(f"Unexpected OpenRouter response: {data}") from exc
+        raise LLMError(f"Unexpected OpenRouter response: {_truncate(str(data))}") from exc
 
     _log_content("OpenRouter", content)
     return content
@@ -195,7 +280,7 @@ def _extract_openai_content_meta(data: Mapping[str, object]) -> tuple[str, str]:
         choice = data["choices"][0]
         message = choice.get("message", {})
     except (KeyError, IndexError, TypeError, AttributeError) as exc:
-        raise LLMError(f"Unexpected OpenAI response: {data}") from exc
+        raise LLMError(f"Unexpected OpenAI response: {_truncate(str(data))}") from exc
 
     content = _flatten_message_content(message.get("content"))
     finish_reason = str(choice.get("finish_reason") or "").strip().lower()
@@ -250,18 +335,10 @@ async def _generate_openrouter(
         top_p=top_p,
         max_tokens=max_tokens,
     )
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": OPENROUTER_APP_URL,
-        "X-Title": OPENROUTER_APP_NAME,
-    }
-    url = f"{OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
-
     data = await _post_json(
         label="OpenRouter",
-        url=url,
-        headers=headers,
+        url=_OPENROUTER_URL,
+        headers=_OPENROUTER_HEADERS,
         payload=payload,
     )
     return _extract_openrouter_content(data)
@@ -281,20 +358,10 @@ async def _generate_openai(
         temperature=temperature,
         max_tokens=max_tokens,
     )
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    if OPENAI_ORG:
-        headers["OpenAI-Organization"] = OPENAI_ORG
-    if OPENAI_PROJECT:
-        headers["OpenAI-Project"] = OPENAI_PROJECT
-
-    url = f"{OPENAI_API_BASE.rstrip('/')}/chat/completions"
     data = await _post_json(
         label="OpenAI",
-        url=url,
-        headers=headers,
+        url=_OPENAI_URL,
+        headers=_OPENAI_HEADERS,
         payload=payload,
     )
     content, finish_reason = _extract_openai_content_meta(data)
@@ -312,14 +379,19 @@ async def _generate_openai(
         )
         retry_data = await _post_json(
             label="OpenAI",
-            url=url,
-            headers=headers,
+            url=_OPENAI_URL,
+            headers=_OPENAI_HEADERS,
             payload=retry_payload,
         )
         return _extract_openai_content(retry_data)
     return content
 
 
+def _as_list(messages: Iterable[Mapping[str, object]]) -> list[Mapping[str, object]]:
+    # Callers almost always pass a list already; payloads only read it, so skip the copy.
+    return messages if isinstance(messages, list) else list(messages)
+
+
 async def generate(
     messages: Iterable[Mapping[str, object]],
     *,
@@ -328,7 +400,7 @@ async def generate(
     max_tokens: int | None = None,
     provider: str | None = None,
 ) -> str:
-    message_list = list(messages)
+    message_list = _as_list(messages)
     provider_name = _normalize_provider(provider)
 
     if provider_name == "openai":
@@ -345,6 +417,39 @@ async def generate(
     )
 
 
+WARMUP_MESSAGES: tuple[dict[str, str], ...] = ({"role": "system", "content": "ping"},)
+
+
+async def warmup(provider: str | None = None) -> None:
+    """Issue a 1-token request so the provider keeps the model loaded.
+
+    Bypasses _post_json: a failed ping is only logged at debug level and never
+    blocks the provider for real requests via _rate_limited_until.
+    """
+    provider_name = _normalize_provider(provider)
+    message_list: list[Mapping[str, object]] = list(WARMUP_MESSAGES)
+    if provider_name == "openai":
+        if not OPENAI_API_KEY:
+            return
+        label, url, headers = "OpenAI", _OPENAI_URL, _OPENAI_HEADERS
+        payload = _build_openai_payload(message_list, temperature=1.0, max_tokens=1)
+    else:
+        if not OPENROUTER_API_KEY:
+            return
+        label, url, headers = "OpenRouter", _OPENROUTER_URL, _OPENROUTER_HEADERS
+        payload = _build_openrouter_payload(message_list, temperature=1.0, top_p=0.9, max_tokens=1)
+    if _rate_limited_until.get(label, 0.0) > time.monotonic():
+        return
+
+    try:
+        response = await _get_http_client().post(url, headers=headers, content=to_json(payload))
+    except httpx.HTTPError as exc:
+        logger.debug("%s warmup failed: %s", label, exc)
+        return
+    if response.is_error:
+        logger.debug("%s warmup failed status=%s", label, response.status_code)
+
+
 FALLBACK_MAP: dict[str, str] = {"openrouter": "openai", "openai": "openrouter"}
 
 
@@ -388,7 +493,7 @@ async def generate_with_fallback(
     Fallback is chosen via FALLBACK_MAP and requires the sibling API key.
     If no fallback is available, the original exception propagates.
     """
-    message_list = list(messages)
+    message_list = _as_list(messages)
     primary_name = _normalize_provider(primary)
     try:
         return await generate(
@@ -1,18 +1,55 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 from datetime import datetime, timezone
+from typing import Any
 
 from aiogram import types
-from sqlalchemy import select
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, SessionTransaction
 
 from ..models.chat import Chat
 from ..models.message import Message
 from ..models.user import User
+from ..utils.cache import TTLCache
+from ..utils.sql import dialect_insert
 
 
+logger = logging.getLogger(__name__)
+
 _PHOTO_SIZE_CAP_BYTES = 8 * 1024 * 1024
 
+# Chats/users whose row is already up to date, keyed by (engine, id) -> title/username.
+# Lets steady-state traffic skip the chat and user upserts entirely.
+_KNOWN_CHATS: TTLCache[tuple[object, int], str] = TTLCache(ttl=600, maxsize=10_000)
+_KNOWN_USERS: TTLCache[tuple[object, int], str | None] = TTLCache(ttl=600, maxsize=10_000)
+# Entries upserted in a session are only promoted to the caches once that session commits.
+_PENDING_KNOWN_ROWS = "message_history.pending_known_rows"
+
+
+def _remember_after_commit(
+    session: AsyncSession,
+    cache: TTLCache[tuple[object, int], Any],
+    key: tuple[object, int],
+    value: object,
+) -> None:
+    session.info.setdefault(_PENDING_KNOWN_ROWS, []).append((cache, key, value))
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_known_rows(session: Session) -> None:
+    for cache, key, value in session.info.pop(_PENDING_KNOWN_ROWS, ()):
+        cache.set(key, value)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_known_rows(session: Session, transaction: SessionTransaction) -> None:
+    # Runs after after_commit, so anything still pending here was rolled back or abandoned.
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KNOWN_ROWS, None)
+
 
 def _largest_storable_photo(photos: list) -> object | None:
     if not photos:
@@ -51,29 +88,148 @@ async def persist_telegram_message(
         return created
 
 
+def _to_naive_utc(value: datetime | None) -> datetime:
+    """Messages.date is a naive UTC column; normalise Telegram's aware datetimes to it."""
+    if value is None:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class MessagePersister:
+    """Writes queued messages in batches, one transaction per batch.
+
+    Meant for writes nobody waits on (e.g. the bot's own replies after they were sent).
+    """
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        *,
+        max_batch: int = 100,
+        max_delay: float = 0.05,
+        maxsize: int = 1000,
+    ) -> None:
+        self._sessionmaker = sessionmaker
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        # None is the stop sentinel put by stop().
+        self._queue: asyncio.Queue[tuple[types.Message, int | None] | None] = asyncio.Queue(maxsize=maxsize)
+
+    def enqueue(self, message: types.Message, *, reply_to_message_id: int | None = None) -> bool:
+        try:
+            self._queue.put_nowait((message, reply_to_message_id))
+        except asyncio.QueueFull:
+            logger.warning(
+                "Message persister queue is full; chat=%s message_id=%s not queued",
+                message.chat.id,
+                message.message_id,
+            )
+            return False
+        return True
+
+    async def run(self) -> None:
+        """Write batches until stop() is called; the batch in hand is written before returning."""
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            deadline = loop.time() + self._max_delay
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def stop(self) -> None:
+        """Ask run() to finish once everything queued before this call is written."""
+        await self._queue.put(None)
+
+    async def flush(self) -> None:
+        batch: list[tuple[types.Message, int | None]] = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        if batch:
+            await self._write(batch)
+
+    async def _write(self, batch: list[tuple[types.Message, int | None]]) -> None:
+        try:
+            async with self._sessionmaker() as session:
+                rows = []
+                for message, reply_to_message_id in batch:
+                    await _ensure_chat(session, message)
+                    await _upsert_user(session, message)
+                    rows.append(_message_row(message, reply_to_message_id=reply_to_message_id))
+                await insert_messages(session, rows)
+                await session.commit()
+        except Exception:
+            logger.exception("Failed to persist %s queued messages", len(batch))
+
+
 async def _ensure_chat(session: AsyncSession, message: types.Message) -> None:
-    chat = await session.get(Chat, message.chat.id)
-    if chat is None:
-        chat = Chat(id=message.chat.id, title=message.chat.title or str(message.chat.id), is_active=True)
-        session.add(chat)
-    elif message.chat.title and chat.title != message.chat.title:
-        chat.title = message.chat.title
+    title = message.chat.title or str(message.chat.id)
+    known_key = (session.get_bind(), message.chat.id)
+    known_title = _KNOWN_CHATS.get(known_key)
+    if known_title is not None and (not message.chat.title or known_title == title):
+        return
+
+    stmt = dialect_insert(session, Chat).values(
+        id=message.chat.id,
+        title=title,
+        is_active=True,
+    )
+    if message.chat.title:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Chat.id],
+            set_={"title": stmt.excluded.title},
+            where=Chat.title.is_distinct_from(stmt.excluded.title),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Chat.id])
+    await session.execute(stmt)
+    _remember_after_commit(session, _KNOWN_CHATS, known_key, title)
 
 
 async def _upsert_user(session: AsyncSession, message: types.Message) -> None:
     if not message.from_user:
         return
 
-    stmt = select(User).where(User.tg_id == message.from_user.id)
-    res = await session.execute(stmt)
-    user = res.scalar_one_or_none()
-
     username = message.from_user.username or message.from_user.full_name
-    if user is None:
-        user = User(tg_id=message.from_user.id, username=username, is_admin_cached=False)
-        session.add(user)
-    elif username and user.username != username:
-        user.username = username
+    known_key = (session.get_bind(), message.from_user.id)
+    if username and _KNOWN_USERS.get(known_key) == username:
+        return
+
+    stmt = dialect_insert(session, User).values(
+        tg_id=message.from_user.id,
+        username=username,
+        is_admin_cached=False,
+    )
+    if username:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.tg_id],
+            set_={"username": stmt.excluded.username},
+            where=User.username.is_distinct_from(stmt.excluded.username),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[User.tg_id])
+    await session.execute(stmt)
+    _remember_after_commit(session, _KNOWN_USERS, known_key, username)
 
 
 async def _insert_message(
@@ -82,17 +238,39 @@ async def _insert_message(
     *,
     reply_to_message_id: int | None = None,
 ) -> bool:
-    stmt = select(Message.id).where(
-        Message.chat_id == message.chat.id,
-        Message.message_id == message.message_id,
-    )
+    row = _message_row(message, reply_to_message_id=reply_to_message_id)
+    stmt = dialect_insert(session, Message).values(**row)
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=[Message.chat_id, Message.message_id],
+    ).returning(Message.id)
+    res = await session.execute(stmt)
+    return res.scalar_one_or_none() is not None
+
+
+async def insert_messages(session: AsyncSession, rows: list[dict[str, object]]) -> int:
+    """Insert many message rows in one statement, skipping ones already stored.
+
+    Returns the number of rows actually inserted.
+    """
+    unique: dict[tuple[object, object], dict[str, object]] = {}
+    for row in rows:
+        unique.setdefault((row["chat_id"], row["message_id"]), row)
+    if not unique:
+        return 0
+    stmt = dialect_insert(session, Message).values(list(unique.values()))
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=[Message.chat_id, Message.message_id],
+    ).returning(Message.id)
     res = await session.execute(stmt)
-    if res.scalar_one_or_none() is not None:
-        return False
+    return len(res.all())
 
-    msg_date = message.date or datetime.utcnow()
-    if msg_date.tzinfo is not None:
-        msg_date = msg_date.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _message_row(
+    message: types.Message,
+    *,
+    reply_to_message_id: int | None = None,
+) -> dict[str, object]:
+    msg_date = _to_naive_utc(message.date)
 
     tg_file_id: str | None = None
     photo_sizes = list(message.photo or [])
@@ -117,23 +295,21 @@ async def _insert_message(
             if isinstance(file_id_value, str) and file_id_value:
                 tg_file_id = file_id_value
 
-    msg = Message(
-        chat_id=message.chat.id,
-        message_id=message.message_id,
-        user_id=message.from_user.id if message.from_user else 0,
-        text=render_message_storage_text(message),
-        reply_to_id=reply_to_message_id
+    return {
+        "chat_id": message.chat.id,
+        "message_id": message.message_id,
+        "user_id": message.from_user.id if message.from_user else 0,
+        "text": render_message_storage_text(message),
+        "reply_to_id": reply_to_message_id
         if reply_to_message_id is not None
         else message.reply_to_message.message_id
         if message.reply_to_message
         else None,
-        date=msg_date,
-        is_bot=bool(message.from_user and message.from_user.is_bot),
-        tg_file_id=tg_file_id,
-        media_group_id=getattr(message, "media_group_id", None),
-    )
-    session.add(msg)
-    return True
+        "date": msg_date,
+        "is_bot": bool(message.from_user and message.from_user.is_bot),
+        "tg_file_id": tg_file_id,
+        "media_group_id": getattr(message, "media_group_id", None),
+    }
 
 
 def render_message_storage_text(message: types.Message) -> str:
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
 from pathlib import Path
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
 
+from pydantic_core import to_json
 from redis.asyncio import Redis
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from ..models.persona import StylePrompt
+from ..utils.cache import TTLCache
 
 DEFAULT_STYLE_KEY = "gopnik"
 
@@ -60,17 +64,30 @@ def load_persona_files(directory: Optional[Path] = None) -> Dict[str, Dict[str,
     return result
 
 
-BASE_STYLE_DATA: Dict[str, Dict[str, str]] = load_persona_files()
-
-DEFAULT_STYLE_PROMPTS: Dict[str, str] = {key: value["prompt"] for key, value in BASE_STYLE_DATA.items()}
+# Read-only: shared by every service and router, and build_system_prompt memoizes
+# prompt bases built from these values.
+BASE_STYLE_DATA: Mapping[str, Mapping[str, str]] = MappingProxyType(
+    {key: MappingProxyType(value) for key, value in load_persona_files().items()}
+)
+DEFAULT_STYLE_PROMPTS: Mapping[str, str] = MappingProxyType(
+    {key: value["prompt"] for key, value in BASE_STYLE_DATA.items()}
+)
 
 
 class StylePromptService:
-    def __init__(self, sessionmaker: async_sessionmaker[AsyncSession], redis: Redis, defaults: Dict[str, Dict[str, str]]):
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker[AsyncSession],
+        redis: Redis,
+        defaults: Mapping[str, Mapping[str, str]],
+    ):
         self._sessionmaker = sessionmaker
         self._redis = redis
         self._defaults = defaults
         self._cache_key = "style_prompts:v1"
+        self._display_key = "style_prompts:display:v1"
+        self._local: TTLCache[str, Dict[str, str]] = TTLCache(ttl=60, maxsize=2)
+        self._load_lock = asyncio.Lock()
 
     async def ensure_defaults(self) -> None:
         # Base personas are now loaded from files and do not go into the DB.
@@ -78,16 +95,32 @@ class StylePromptService:
 
     async def _fetch_all(self) -> Dict[str, StylePrompt]:
         async with self._sessionmaker() as session:
-            res = await session.execute(select(StylePrompt))
-            return {row.style: row for row in res.scalars()}
+            rows = await session.stream_scalars(
+                select(StylePrompt).execution_options(yield_per=100)
+            )
+            return {row.style: row async for row in rows}
 
     async def get_entries(self) -> Dict[str, StylePrompt]:
         return await self._fetch_all()
 
     async def get_all(self) -> Dict[str, str]:
+        local = self._local.get(self._cache_key)
+        if local is not None:
+            return dict(local)
+        # A burst of callers after expiry shares one Redis/DB load instead of each doing it.
+        async with self._load_lock:
+            return dict(await self._load())
+
+    async def _load(self) -> Dict[str, str]:
+        local = self._local.get(self._cache_key)
+        if local is not None:
+            return local
+
         cached = await self._redis.get(self._cache_key)
         if cached is not None:
-            return json.loads(cached)
+            data: Dict[str, str] = json.loads(cached)
+            self._local.set(self._cache_key, data)
+            return data
 
         # Start with file-based defaults, then overlay only CUSTOM DB personas.
         prompts: Dict[str, str] = {style: data["prompt"] for style, data in self._defaults.items()}
@@ -96,7 +129,8 @@ class StylePromptService:
             if style not in self._defaults:
                 prompts[style] = obj.prompt
 
-        await self._redis.set(self._cache_key, json.dumps(prompts, ensure_ascii=False), ex=300)
+        await self._redis.set(self._cache_key, to_json(prompts), ex=300)
+        self._local.set(self._cache_key, prompts)
         return prompts
 
     async def get(self, style: str) -> str:
@@ -106,13 +140,25 @@ class StylePromptService:
         return prompts.get(style, default_prompt)
 
     async def get_display_map(self) -> Dict[str, str]:
+        local = self._local.get(self._display_key)
+        if local is not None:
+            return dict(local)
+
+        cached = await self._redis.get(self._display_key)
+        if cached is not None:
+            data: Dict[str, str] = json.loads(cached)
+            self._local.set(self._display_key, data)
+            return dict(data)
+
         # Start with file-based defaults, then overlay only CUSTOM DB personas.
         display_map: Dict[str, str] = {style: data["display_name"] for style, data in self._defaults.items()}
         records = await self._fetch_all()
         for style, obj in records.items():
             if style not in self._defaults:
                 display_map[style] = obj.display_name
-        return display_map
+        await self._redis.set(self._display_key, to_json(display_map), ex=300)
+        self._local.set(self._display_key, display_map)
+        return dict(display_map)
 
     async def list_styles(self) -> list[tuple[str, str]]:
         display_map = await self.get_display_map()
@@ -122,38 +168,56 @@ class StylePromptService:
             if style in display_map:
                 ordered.append((style, display_map[style]))
         custom = sorted(
-            ((style, name) for style, name in display_map.items() if style not in self._defaults),
-            key=lambda item: item[1].lower(),
+            (name.casefold(), style, name)
+            for style, name in display_map.items()
+            if style not in self._defaults
         )
-        ordered.extend(custom)
+        ordered.extend((style, name) for _, style, name in custom)
         return ordered
 
     async def set(self, style: str, prompt: str, *, display_name: str | None = None) -> None:
+        await self.set_many({style: (prompt, display_name)})
+
+    def normalize_entry(self, style: str, display_name: str | None) -> tuple[str, str | None]:
+        """Проверяет код и название персоны перед записью; бросает ValueError при ошибке."""
         style = style.strip().lower()
         if not style:
             raise ValueError("Style identifier cannot be empty")
         if style in self._defaults:
             raise ValueError("Нельзя изменить базовую персону")
+        display: str | None = None
         if display_name is not None:
             display = display_name.strip()
             if not display:
                 raise ValueError("Display name cannot be empty")
-        else:
-            display = None
+        return style, display
+
+    async def set_many(self, items: Mapping[str, tuple[str, str | None]]) -> None:
+        """Сохраняет несколько персон одной транзакцией и одной инвалидацией кэша."""
+        normalized: dict[str, tuple[str, str | None]] = {}
+        for raw_style, (prompt, display_name) in items.items():
+            style, display = self.normalize_entry(raw_style, display_name)
+            normalized[style] = (prompt, display)
+        if not normalized:
+            return
 
         async with self._sessionmaker() as session:
-            obj = await session.get(StylePrompt, style)
-            if obj is None:
-                if display is None:
-                    display = style
-                obj = StylePrompt(style=style, display_name=display, prompt=prompt)
-                session.add(obj)
-            else:
-                obj.prompt = prompt
-                if display is not None:
-                    obj.display_name = display
+            res = await session.execute(
+                select(StylePrompt).where(StylePrompt.style.in_(normalized))
+            )
+            existing = {obj.style: obj for obj in res.scalars()}
+            for style, (prompt, display) in normalized.items():
+                obj = existing.get(style)
+                if obj is None:
+                    session.add(StylePrompt(style=style, display_name=display or style, prompt=prompt))
+                else:
+                    obj.prompt = prompt
+                    if display is not None:
+                        obj.display_name = display
             await session.commit()
-        await self._redis.delete(self._cache_key)
+        self._local.pop(self._cache_key)
+        self._local.pop(self._display_key)
+        await self._redis.delete(self._cache_key, self._display_key)
 
     async def delete(self, style: str) -> None:
         if style in self._defaults:
@@ -164,4 +228,6 @@ class StylePromptService:
                 return
             await session.delete(obj)
             await session.commit()
-        await self._redis.delete(self._cache_key)
+        self._local.pop(self._cache_key)
+        self._local.pop(self._display_key)
+        await self._redis.delete(self._cache_key, self._display_key)
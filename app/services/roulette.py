@@ -5,6 +5,7 @@ import logging
 import random
 import re
 from collections import Counter
+from collections.abc import Sequence
 from dataclasses import dataclass
 from datetime import date, datetime, time
 from zoneinfo import ZoneInfo
@@ -12,11 +13,12 @@ from zoneinfo import ZoneInfo
 import sqlalchemy as sa
 from aiogram import Bot
 from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from redis.asyncio import Redis
 from sqlalchemy import desc, func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from ..models.chat import Chat
+from ..models.chat import Chat, ChatSetting
 from ..models.roulette import RouletteParticipant, RouletteScoreAdjustment, RouletteWinner
 from ..services.app_config import AppConfigService
 from ..services.context import (
@@ -39,16 +41,14 @@ from ..services.persona import StylePromptService
 from ..services.settings import SettingsService
 from ..services.user_memory import UserMemoryService
 from ..utils.llm import resolve_temperature
+from ..utils.sql import dialect_insert
 
 logger = logging.getLogger("roulette")
 MoscowTZ = ZoneInfo("Europe/Moscow")
+# Auto-rolls run in parallel (LLM title + announcement each); each holds a DB session.
+_AUTO_ROLL_CONCURRENCY = 4
+_PARTICIPANT_COUNT_TTL = 3600
 
-LEGACY_TITLE_CHOICES = [
-    ("pidor", "Пидор"),
-    ("skuf", "Скуф"),
-    ("beauty", "Красавчик"),
-    ("clown", "Клоун"),
-]
 DEFAULT_GENERATED_TITLE = "Герой дня"
 
 DEFAULT_ROULETTE_PROMPT = (
@@ -78,6 +78,10 @@ def _looks_like_bot_username(username: str | None) -> bool:
     return bool(username and username.strip().lower().endswith("bot"))
 
 
+def _participant_count_key(chat_id: int) -> str:
+    return f"roulette:count:{chat_id}"
+
+
 def _coerce_int(value: object, default: int) -> int:
     if isinstance(value, bool):
         return int(value)
@@ -121,6 +125,7 @@ class RouletteService:
         *,
         bot: Bot,
         sessionmaker: async_sessionmaker[AsyncSession],
+        redis: Redis,
         settings: SettingsService,
         app_config: AppConfigService,
         context: ContextService,
@@ -129,6 +134,7 @@ class RouletteService:
     ) -> None:
         self.bot = bot
         self.sessionmaker = sessionmaker
+        self.redis = redis
         self.settings = settings
         self.app_config = app_config
         self.context = context
@@ -148,12 +154,11 @@ class RouletteService:
 
     async def _has_winner_today(self, session: AsyncSession, chat_id: int) -> bool:
         stmt = (
-            select(func.count())
-            .select_from(RouletteWinner)
+            select(RouletteWinner.id)
             .where(RouletteWinner.chat_id == chat_id, RouletteWinner.won_at == self._today())
+            .limit(1)
         )
-        count = (await session.execute(stmt)).scalar() or 0
-        return count > 0
+        return (await session.execute(stmt)).first() is not None
 
     async def roll(self, chat_id: int, *, initiator: str | None = None, force: bool = False) -> RollResult:
         today = self._today()
@@ -167,8 +172,9 @@ class RouletteService:
                     return RollResult(False, "Некого разыгрывать — зарегистрируйтесь командой /reg.")
 
                 winner_user_id, winner_username = random.choice(participants)
-                conf = await self.settings.get_all(chat_id)
-                app_conf = await self.app_config.get_all()
+                conf, app_conf = await asyncio.gather(
+                    self.settings.get_all(chat_id), self.app_config.get_all()
+                )
                 title_code, title_display = await self._pick_title(
                     session,
                     chat_id=chat_id,
@@ -214,51 +220,77 @@ class RouletteService:
 
                 return RollResult(True, "Розыгрыш завершён!")
 
-    async def _fetch_participants(self, session: AsyncSession, chat_id: int) -> list[tuple[int, str | None]]:
+    async def _fetch_participants(
+        self, session: AsyncSession, chat_id: int
+    ) -> Sequence[tuple[int, str | None]]:
         stmt = (
             select(RouletteParticipant.user_id, RouletteParticipant.username)
             .where(RouletteParticipant.chat_id == chat_id)
         )
-        rows = await session.execute(stmt)
-        return [(row[0], row[1]) for row in rows.fetchall()]
+        # Rows already behave as (user_id, username) tuples; no need to copy them.
+        return (await session.execute(stmt)).tuples().all()
 
     async def register_participant(self, chat_id: int, user_id: int, username: str | None) -> tuple[bool, int]:
         # ignore obvious bot accounts by username suffix
         if _looks_like_bot_username(username):
             return False, await self.participant_count(chat_id)
         async with self.sessionmaker() as session:
-            stmt = select(RouletteParticipant).where(
-                RouletteParticipant.chat_id == chat_id,
-                RouletteParticipant.user_id == user_id,
+            stmt = (
+                dialect_insert(session, RouletteParticipant)
+                .values(chat_id=chat_id, user_id=user_id, username=username)
+                .on_conflict_do_nothing(
+                    index_elements=[RouletteParticipant.chat_id, RouletteParticipant.user_id]
+                )
+                .returning(RouletteParticipant.id)
             )
-            existing = (await session.execute(stmt)).scalar_one_or_none()
-            if existing is None:
-                participant = RouletteParticipant(
-                    chat_id=chat_id,
-                    user_id=user_id,
-                    username=username,
+            is_new = (await session.execute(stmt)).first() is not None
+            updated = False
+            if not is_new and username:
+                # The new username is not bot-like, so a row flagged by its old one counts again.
+                res = await session.execute(
+                    sa.update(RouletteParticipant)
+                    .where(
+                        RouletteParticipant.chat_id == chat_id,
+                        RouletteParticipant.user_id == user_id,
+                        sa.or_(
+                            RouletteParticipant.username.is_distinct_from(username),
+                            RouletteParticipant.is_bot.is_(True),
+                        ),
+                    )
+                    .values(username=username, is_bot=False)
+                    .returning(RouletteParticipant.id)
                 )
-                session.add(participant)
-                is_new = True
-            else:
-                if username and existing.username != username:
-                    existing.username = username
-                is_new = False
-            try:
-                await session.commit()
-            except IntegrityError:
-                await session.rollback()
-                is_new = False
+                updated = res.first() is not None
+            await session.commit()
 
-        count = await self.participant_count(chat_id)
-        return is_new, count
+        if is_new:
+            return True, await self._participant_count_changed(chat_id)
+        if updated:
+            return False, await self._participant_count_changed(chat_id)
+        return False, await self.participant_count(chat_id)
 
     async def participant_count(self, chat_id: int) -> int:
+        cached = await self.redis.get(_participant_count_key(chat_id))
+        if cached is not None:
+            return int(cached)
+        return await self._refresh_participant_count(chat_id)
+
+    async def _participant_count_changed(self, chat_id: int) -> int:
+        # Drop the cached count instead of INCR/DECR: a concurrent refresh may already have
+        # cached a count that includes this write. The next read recounts.
+        await self.redis.delete(_participant_count_key(chat_id))
+        return await self._count_participants(chat_id)
+
+    async def _refresh_participant_count(self, chat_id: int) -> int:
+        count = await self._count_participants(chat_id)
+        await self.redis.set(_participant_count_key(chat_id), count, ex=_PARTICIPANT_COUNT_TTL)
+        return count
+
+    async def _count_participants(self, chat_id: int) -> int:
         async with self.sessionmaker() as session:
-            username_col = sa.func.trim(sa.func.coalesce(RouletteParticipant.username, ""))
             stmt = select(func.count(RouletteParticipant.id)).where(
                 RouletteParticipant.chat_id == chat_id,
-                sa.not_(username_col.ilike("%bot")),
+                RouletteParticipant.is_bot.is_(False),
             )
             return (await session.execute(stmt)).scalar() or 0
 
@@ -271,9 +303,12 @@ class RouletteService:
             participant = (await session.execute(stmt)).scalar_one_or_none()
             if participant is None:
                 return False, await self.participant_count(chat_id)
+            counted = not participant.is_bot
             await session.delete(participant)
             await session.commit()
-        return True, await self.participant_count(chat_id)
+        if not counted:
+            return True, await self.participant_count(chat_id)
+        return True, await self._participant_count_changed(chat_id)
 
     async def _pick_title(
         self,
@@ -381,9 +416,11 @@ class RouletteService:
         username: str | None,
         title_display: str,
     ) -> bool:
-        conf = await self.settings.get_all(chat_id)
-        app_conf = await self.app_config.get_all()
-        style_prompts = await self.personas.get_all()
+        conf, app_conf, style_prompts = await asyncio.gather(
+            self.settings.get_all(chat_id),
+            self.app_config.get_all(),
+            self.personas.get_all(),
+        )
         provider = resolve_llm_options(app_conf)
 
         max_turns = int(app_conf.get("context_max_turns", 100) or 100)
@@ -951,9 +988,7 @@ class RouletteService:
                 )
             ).scalar_one_or_none()
 
-        display_map = {code: name for code, name in LEGACY_TITLE_CHOICES}
         custom_title = str(conf.get("roulette_custom_title") or "").strip()
-        display_map["custom"] = custom_title or "Своё звание"
 
         if custom_title:
             heading_title = custom_title
@@ -1005,15 +1040,12 @@ class RouletteService:
                 RouletteScoreAdjustment.created_at < datetime.combine(end, time.min)
             )
 
-        wins_rows = (await session.execute(wins_stmt)).all()
-        adj_rows = (await session.execute(adj_stmt)).all()
-
         by_user_count: dict[int, int] = {}
         by_user_name: dict[int, str | None] = {}
-        for user_id, cnt, username in wins_rows:
+        for user_id, cnt, username in await session.execute(wins_stmt):
             by_user_count[user_id] = int(cnt)
             by_user_name[user_id] = username
-        for user_id, delta_sum in adj_rows:
+        for user_id, delta_sum in await session.execute(adj_stmt):
             by_user_count[user_id] = by_user_count.get(user_id, 0) + int(delta_sum)
             by_user_name.setdefault(user_id, None)
 
@@ -1052,33 +1084,59 @@ class RouletteService:
             await session.commit()
 
     async def run_auto_roll(self) -> None:
+        today = self._today()
+        has_winner = (
+            select(RouletteWinner.id)
+            .where(RouletteWinner.chat_id == Chat.id, RouletteWinner.won_at == today)
+            .exists()
+        )
+        has_participants = (
+            select(RouletteParticipant.id).where(RouletteParticipant.chat_id == Chat.id).exists()
+        )
+        # The flag is a JSON boolean; its text form is "true" on both JSONB and SQLite JSON.
+        auto_enabled = (
+            select(ChatSetting.id)
+            .where(
+                ChatSetting.chat_id == Chat.id,
+                ChatSetting.key == "roulette_auto_enabled",
+                sa.cast(ChatSetting.value, sa.Text) == "true",
+            )
+            .exists()
+        )
         async with self.sessionmaker() as session:
             # Scheduled broadcasts are group-only. Until chats persist Telegram
             # chat.type explicitly, positive Telegram ids are private/user chats.
-            stmt = select(Chat.id).where(Chat.is_active.is_(True), Chat.id < 0)
-            chats = [row[0] for row in (await session.execute(stmt)).fetchall()]
-        for chat_id in chats:
-            conf = await self.settings.get_all(chat_id)
-            if not conf.get("roulette_auto_enabled"):
-                continue
-            async with self.sessionmaker() as session:
-                if await self._has_winner_today(session, chat_id):
-                    continue
-                participants = await self._fetch_participants(session, chat_id)
-                if not participants:
-                    continue
-            result = await self.roll(chat_id, initiator="auto", force=False)
+            stmt = select(Chat.id).where(
+                Chat.is_active.is_(True),
+                Chat.id < 0,
+                auto_enabled,
+                ~has_winner,
+                has_participants,
+            )
+            eligible = list((await session.execute(stmt)).scalars())
+        if not eligible:
+            return
+
+        semaphore = asyncio.Semaphore(_AUTO_ROLL_CONCURRENCY)
+
+        async def _auto_roll(chat_id: int) -> None:
+            async with semaphore:
+                try:
+                    result = await self.roll(chat_id, initiator="auto", force=False)
+                except Exception:
+                    logger.exception("Auto-roll failed chat=%s", chat_id)
+                    return
             if not result.success:
                 logger.info("Auto-roll skipped chat=%s reason=%s", chat_id, result.message)
 
+        await asyncio.gather(*(_auto_roll(chat_id) for chat_id in eligible))
+
+
+_HTML_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
 
 def escape_html(text: str | None) -> str:
     if not text:
         return "Игрок"
-    return (
-        str(text)
-        .replace("&", "&amp;")
-        .replace("<", "&lt;")
-        .replace(">", "&gt;")
-        .replace('"', "&quot;")
-    )
+    # Single pass; unlike chained replace() there is no ordering trap around "&".
+    return str(text).translate(_HTML_ESCAPE_TABLE)
@@ -4,10 +4,12 @@ import json
 from datetime import datetime
 from typing import Any, Dict, Protocol
 
+from pydantic_core import to_json
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from ..models.chat import Chat, ChatSetting
+from ..utils.cache import TTLCache
 
 
 class SettingsCache(Protocol):
@@ -31,6 +33,8 @@ class SettingsService:
     def __init__(self, sessionmaker: async_sessionmaker[AsyncSession], redis: SettingsCache):
         self._sessionmaker = sessionmaker
         self._redis = redis
+        # Read on every incoming message; writes go through set(), which drops the entry.
+        self._all_cache: TTLCache[int, Dict[str, Any]] = TTLCache(ttl=30, maxsize=4096)
 
     async def get(self, chat_id: int, key: str) -> Any:
         cache_key = f"chat:{chat_id}:setting:{key}"
@@ -47,12 +51,24 @@ class SettingsService:
         return value
 
     async def get_all(self, chat_id: int) -> Dict[str, Any]:
-        out = DEFAULTS.copy()
-        async with self._sessionmaker() as session:
-            res = await session.execute(select(ChatSetting).where(ChatSetting.chat_id == chat_id))
-            for s in res.scalars():
-                out[s.key] = s.value
-        return out
+        cached = self._all_cache.get(chat_id)
+        if cached is not None:
+            return dict(cached)
+        # Redis holds only the chat's overrides so a change to DEFAULTS applies immediately.
+        cache_key = f"chat:{chat_id}:settings:v1"
+        raw = await self._redis.get(cache_key)
+        if raw is not None:
+            overrides: Dict[str, Any] = json.loads(raw)
+        else:
+            async with self._sessionmaker() as session:
+                res = await session.execute(
+                    select(ChatSetting.key, ChatSetting.value).where(ChatSetting.chat_id == chat_id)
+                )
+                overrides = {key: value for key, value in res.all()}
+            await self._redis.set(cache_key, _serialize(overrides), ex=300)
+        out = DEFAULTS | overrides
+        self._all_cache.set(chat_id, out)
+        return dict(out)
 
     async def set(self, chat_id: int, key: str, value: Any) -> None:
         async with self._sessionmaker() as session:
@@ -73,8 +89,10 @@ class SettingsService:
                 row.updated_at = datetime.utcnow()
             await session.commit()
         # invalidate cache
-        await self._redis.delete(f"chat:{chat_id}:setting:{key}")
+        self._all_cache.pop(chat_id)
+        await self._redis.delete(f"chat:{chat_id}:setting:{key}", f"chat:{chat_id}:settings:v1")
 
 
-def _serialize(value: Any) -> str:
-    return json.dumps(value, ensure_ascii=False)
+def _serialize(value: Any) -> bytes:
+    # pydantic-core's native encoder; stdlib json escapes Cyrillic text char by char.
+    return to_json(value)
@@ -2,8 +2,9 @@
 
 Owns the "should the bot act now?" decision that is currently scattered
 across :mod:`app.services.interjector` and :mod:`app.services.reactions`.
-Exposes :meth:`SpontaneityPolicy.mark_acted` to record cooldown
-timestamps in Redis, plus :meth:`can_interject` / :meth:`can_react` that
+Exposes :meth:`SpontaneityPolicy.mark_acted` to start cooldown
+timers in Redis, :meth:`~SpontaneityPolicy.release` to hand back an
+unused claim, plus :meth:`can_interject` / :meth:`can_react` that
 combine quiet hours, cooldowns, and a dice roll to answer "can the bot
 act now?".
 """
@@ -16,7 +17,8 @@ import time
 from datetime import datetime
 from datetime import time as dtime
 from enum import Enum
-from typing import Any, Callable
+from functools import lru_cache
+from typing import Any, Callable, Sequence
 
 from redis.asyncio import Redis
 
@@ -25,11 +27,10 @@ from .settings import SettingsService
 
 logger = logging.getLogger(__name__)
 
-_LONG_KEY = "spontaneity:long:{chat_id}"
-_SHORT_KEY = "spontaneity:short:{chat_id}"
-# 24h TTL is well above any realistic cooldown; keys are refreshed on every
-# action so this is just a safety net against stale entries lingering forever.
-_KEY_TTL_SEC = 24 * 60 * 60
+# A cooldown is active while its key exists: keys are written with the cooldown
+# as TTL, and claimed with SET NX so concurrent triggers can't both pass.
+_LONG_KEY = "spontaneity:cd:long:{chat_id}"
+_SHORT_KEY = "spontaneity:cd:short:{chat_id}"
 
 _DEFAULT_INTERJECT_P = 5
 _DEFAULT_REVIVE_P = 50
@@ -45,6 +46,12 @@ def _parse_quiet_hours(raw: object) -> tuple[dtime, dtime] | None:
 
     if not isinstance(raw, str) or "-" not in raw:
         return None
+    return _parse_quiet_window(raw)
+
+
+@lru_cache(maxsize=512)
+def _parse_quiet_window(raw: str) -> tuple[dtime, dtime] | None:
+    # Chats rarely change quiet_hours; parse each distinct string once (invalid ones too).
     try:
         start_s, end_s = raw.split("-", 1)
         start = datetime.strptime(start_s.strip(), "%H:%M").time()
@@ -114,21 +121,37 @@ class SpontaneityPolicy:
         don't lock out messages and vice versa.
         """
 
-        now = self._clock()
-        if action in (ActionKind.INTERJECT, ActionKind.DIRECT_REPLY):
-            key = _LONG_KEY.format(chat_id=chat_id)
-        elif action is ActionKind.REACTION:
-            key = _SHORT_KEY.format(chat_id=chat_id)
+        app_conf = await self._app_config.get_all()
+        key = self._cooldown_key(chat_id, action)
+        if action is ActionKind.REACTION:
+            cooldown_min = self._react_cooldown_min(app_conf)
         else:
-            raise ValueError(f"unknown action: {action}")
-        await self._redis.set(key, str(now), ex=_KEY_TTL_SEC)
+            cooldown_min = self._interject_cooldown_min(app_conf)
+        if cooldown_min > 0:
+            await self._redis.set(key, str(self._clock()), ex=cooldown_min * 60)
+
+    async def release(self, *, chat_id: int, action: ActionKind) -> None:
+        """Give back a cooldown claimed by a ``True`` check when nothing was posted.
+
+        Callers use this when the reaction or reply they were cleared for
+        was declined, failed, or hit a limit, so the chat is not locked out
+        for a full cooldown with nothing to show for it.
+        """
+
+        await self._redis.delete(self._cooldown_key(chat_id, action))
 
     async def can_interject(self, chat_id: int, *, trigger: InterjectTrigger) -> bool:
         """Decide whether the bot may send an unsolicited message now.
 
-        Vetoes in this order: quiet hours (per-chat), the "long" cooldown
-        shared with direct replies, then a dice roll against either
-        ``interject_p`` or ``revive_p`` depending on the trigger.
+        Vetoes in this order: quiet hours (per-chat), a dice roll against
+        either ``interject_p`` or ``revive_p`` depending on the trigger,
+        then the "long" cooldown shared with direct replies. The vetoes are
+        independent, so rolling before the Redis lookup keeps the odds the
+        same while most calls skip the round trip.
+
+        A ``True`` answer claims the cooldown, so callers racing on the
+        same chat get ``False`` until it expires; callers that end up not
+        sending anything hand it back with :meth:`release`.
         """
 
         app_conf = await self._app_config.get_all()
@@ -137,25 +160,53 @@ class SpontaneityPolicy:
         if self._is_quiet(chat_conf):
             return False
 
-        cooldown_min = int(
-            app_conf.get("interject_cooldown_min", _DEFAULT_INTERJECT_COOLDOWN_MIN) or 0
-        )
-        if await self._long_cooldown_active(chat_id, cooldown_min):
+        if trigger is InterjectTrigger.REVIVE:
+            probability = int(app_conf.get("revive_p", _DEFAULT_REVIVE_P) or 0)
+        else:
+            probability = int(app_conf.get("interject_p", _DEFAULT_INTERJECT_P) or 0)
+        if not self._roll_dice(probability):
             return False
 
+        return await self._claim(_LONG_KEY, chat_id, self._interject_cooldown_min(app_conf))
+
+    async def interject_candidates(
+        self, chat_ids: Sequence[int], *, trigger: InterjectTrigger
+    ) -> list[int]:
+        """Batch form of :meth:`can_interject` for periodic sweeps.
+
+        Same vetoes and odds, but the cooldowns of every chat that survives
+        quiet hours and the dice are claimed in a single pipeline.
+        """
+
+        app_conf = await self._app_config.get_all()
         if trigger is InterjectTrigger.REVIVE:
             probability = int(app_conf.get("revive_p", _DEFAULT_REVIVE_P) or 0)
         else:
             probability = int(app_conf.get("interject_p", _DEFAULT_INTERJECT_P) or 0)
 
-        return self._roll_dice(probability)
+        rolled: list[int] = []
+        for chat_id in chat_ids:
+            chat_conf = await self._settings.get_all(chat_id)
+            if not self._is_quiet(chat_conf) and self._roll_dice(probability):
+                rolled.append(chat_id)
+
+        cooldown_min = self._interject_cooldown_min(app_conf)
+        if not rolled or cooldown_min <= 0:
+            return rolled
+        value = str(self._clock())
+        pipe = self._redis.pipeline()
+        for chat_id in rolled:
+            pipe.set(_LONG_KEY.format(chat_id=chat_id), value, ex=cooldown_min * 60, nx=True)
+        claimed = await pipe.execute()
+        return [chat_id for chat_id, ok in zip(rolled, claimed) if ok]
 
     async def can_react(self, chat_id: int) -> bool:
         """Decide whether the bot may add a reaction now.
 
         Uses the "short" cooldown timer, independent of the long one
         shared by messages — a recent interject must not block a
-        reaction. Vetoes in order: quiet hours, short cooldown, dice.
+        reaction. Vetoes in order: quiet hours, dice, short cooldown.
+        Like :meth:`can_interject`, a ``True`` answer claims the cooldown.
         """
 
         app_conf = await self._app_config.get_all()
@@ -164,14 +215,11 @@ class SpontaneityPolicy:
         if self._is_quiet(chat_conf):
             return False
 
-        cooldown_min = int(
-            app_conf.get("react_cooldown_min", _DEFAULT_REACT_COOLDOWN_MIN) or 0
-        )
-        if await self._short_cooldown_active(chat_id, cooldown_min):
+        probability = int(app_conf.get("reaction_p", _DEFAULT_REACTION_P) or 0)
+        if not self._roll_dice(probability):
             return False
 
-        probability = int(app_conf.get("reaction_p", _DEFAULT_REACTION_P) or 0)
-        return self._roll_dice(probability)
+        return await self._claim(_SHORT_KEY, chat_id, self._react_cooldown_min(app_conf))
 
     async def should_reply_with_voice(
         self, chat_id: int, *, incoming_is_voice_reply_to_bot: bool,
@@ -206,25 +254,34 @@ class SpontaneityPolicy:
             return True
         return self._rng() * 100 < probability_percent
 
-    async def _long_cooldown_active(self, chat_id: int, cooldown_min: int) -> bool:
-        return await self._cooldown_active(_LONG_KEY, chat_id, cooldown_min)
+    @staticmethod
+    def _cooldown_key(chat_id: int, action: ActionKind) -> str:
+        if action in (ActionKind.INTERJECT, ActionKind.DIRECT_REPLY):
+            return _LONG_KEY.format(chat_id=chat_id)
+        if action is ActionKind.REACTION:
+            return _SHORT_KEY.format(chat_id=chat_id)
+        raise ValueError(f"unknown action: {action}")
+
+    @staticmethod
+    def _interject_cooldown_min(app_conf: dict[str, Any]) -> int:
+        return int(app_conf.get("interject_cooldown_min", _DEFAULT_INTERJECT_COOLDOWN_MIN) or 0)
 
-    async def _short_cooldown_active(self, chat_id: int, cooldown_min: int) -> bool:
-        return await self._cooldown_active(_SHORT_KEY, chat_id, cooldown_min)
+    @staticmethod
+    def _react_cooldown_min(app_conf: dict[str, Any]) -> int:
+        return int(app_conf.get("react_cooldown_min", _DEFAULT_REACT_COOLDOWN_MIN) or 0)
+
+    async def _claim(self, key_template: str, chat_id: int, cooldown_min: int) -> bool:
+        """Start the cooldown unless one is already running; ``True`` if we got it."""
 
-    async def _cooldown_active(
-        self, key_template: str, chat_id: int, cooldown_min: int
-    ) -> bool:
         if cooldown_min <= 0:
-            return False
-        raw = await self._redis.get(key_template.format(chat_id=chat_id))
-        if raw is None:
-            return False
-        try:
-            last = float(raw.decode() if isinstance(raw, (bytes, bytearray)) else raw)
-        except (ValueError, AttributeError):
-            return False
-        return (self._clock() - last) < cooldown_min * 60
+            return True
+        claimed = await self._redis.set(
+            key_template.format(chat_id=chat_id),
+            str(self._clock()),
+            ex=cooldown_min * 60,
+            nx=True,
+        )
+        return bool(claimed)
 
     def _is_quiet(self, chat_conf: dict[str, Any]) -> bool:
         window = _parse_quiet_hours(chat_conf.get("quiet_hours"))
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from collections.abc import Sequence
 from datetime import datetime, timedelta
 from typing import Any, Protocol
@@ -12,7 +13,6 @@ class RedisPipeline(Protocol):
     def incr(self, key: str, amount: int = 1) -> "RedisPipeline": ...
     def decr(self, key: str, amount: int = 1) -> "RedisPipeline": ...
     def expire(self, key: str, ttl: int, nx: bool = False) -> "RedisPipeline": ...
-    def set(self, key: str, value: Any) -> "RedisPipeline": ...
     def delete(self, *keys: str) -> "RedisPipeline": ...
     async def execute(self) -> list[Any]: ...
 
@@ -20,7 +20,6 @@ class RedisPipeline(Protocol):
 class UsageRedis(Protocol):
     def pipeline(self) -> RedisPipeline: ...
     async def get(self, key: str) -> Any: ...
-    async def mget(self, *keys: str | list[str] | tuple[str, ...]) -> list[Any]: ...
 
 
 class UsageLimiter:
@@ -29,6 +28,8 @@ class UsageLimiter:
     def __init__(self, redis: UsageRedis, *, timezone: ZoneInfo | None = None) -> None:
         self._redis = redis
         self._tz = timezone or ZoneInfo("UTC")
+        # (YYYYMMDD, next local midnight as a Unix timestamp); rebuilt once per day.
+        self._day_cache: tuple[str, float] = ("", 0.0)
 
     async def consume(
         self,
@@ -63,37 +64,31 @@ class UsageLimiter:
         if not valid:
             return True, {}, []
 
+        # INCR and EXPIRE go out together: the common (allowed) case costs one round trip.
+        ttl = self._seconds_left()
         pipe = self._redis.pipeline()
         for _, key, _ in valid:
             pipe.incr(key, 1)
-        increments = await pipe.execute()
+            pipe.expire(key, ttl, nx=False)
+        results = await pipe.execute()
+        increments = [int(value) for value in results[::2]]
 
-        exceeded: list[str] = []
-        for (prefix, _key, limit), value in zip(valid, increments):
-            if value > limit:
-                exceeded.append(prefix)
+        exceeded = [
+            prefix
+            for (prefix, _key, limit), value in zip(valid, increments)
+            if value > limit
+        ]
 
         if exceeded:
             pipe = self._redis.pipeline()
-            for (_, key, limit), value in zip(valid, increments):
-                if limit > 0 and value > 0:
+            for (_, key, _), value in zip(valid, increments):
+                if value > 0:
                     pipe.decr(key, 1)
             await pipe.execute()
-
-            current_values = await self._redis.mget([key for _, key, _ in valid])
-            counts = {
-                prefix: int(value or 0)
-                for (prefix, _, _), value in zip(valid, current_values)
-            }
+            # After the rollback each counter is back to its pre-increment value.
+            counts = {prefix: max(0, value - 1) for (prefix, _, _), value in zip(valid, increments)}
             return False, counts, exceeded
 
-        ttl = self._seconds_left()
-        pipe = self._redis.pipeline()
-        for _, key, limit in valid:
-            if limit > 0:
-                pipe.expire(key, ttl, nx=False)
-        await pipe.execute()
-
         counts = {prefix: value for (prefix, _, _), value in zip(valid, increments)}
         return True, counts, []
 
@@ -106,33 +101,28 @@ class UsageLimiter:
         if not prefixes:
             return
         keys = [self._key(prefix, chat_id) for prefix in prefixes]
-        existing_values = await self._redis.mget(keys)
         pipe = self._redis.pipeline()
         for key in keys:
             pipe.decr(key, 1)
         results = await pipe.execute()
-        corrections = []
-        for key, before, result in zip(keys, existing_values, results):
-            if result is None or result >= 0:
-                continue
-            if before is None:
-                corrections.append(("delete", key))
-            else:
-                corrections.append(("set", key))
-        if corrections:
+        # A counter only goes negative when it was missing or already zero; reads treat a
+        # missing key as zero, so drop it rather than paying an MGET up front to tell them apart.
+        negative = [key for key, result in zip(keys, results) if result is not None and result < 0]
+        if negative:
             pipe = self._redis.pipeline()
-            for action, key in corrections:
-                if action == "delete":
-                    pipe.delete(key)
-                else:
-                    pipe.set(key, 0)
+            pipe.delete(*negative)
             await pipe.execute()
 
     def _key(self, prefix: str, chat_id: int) -> str:
-        day = datetime.now(self._tz).strftime("%Y%m%d")
-        return f"usage:{prefix}:{chat_id}:{day}"
+        return f"usage:{prefix}:{chat_id}:{self._today()[0]}"
 
     def _seconds_left(self) -> int:
+        return max(1, int(self._today()[1] - time.time()))
+
+    def _today(self) -> tuple[str, float]:
+        if time.time() < self._day_cache[1]:
+            return self._day_cache
         now = datetime.now(self._tz)
         tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        return max(1, int((tomorrow - now).total_seconds()))
+        self._day_cache = (now.strftime("%Y%m%d"), tomorrow.timestamp())
+        return self._day_cache
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+from collections import OrderedDict
 
 
 def get_chat_lock(chat_id: int, locks: dict[int, asyncio.Lock]) -> asyncio.Lock:
@@ -10,3 +11,35 @@ def get_chat_lock(chat_id: int, locks: dict[int, asyncio.Lock]) -> asyncio.Lock:
         lock = asyncio.Lock()
         locks[chat_id] = lock
     return lock
+
+
+class ChatLockRegistry:
+    """Per-chat asyncio.Lock registry capped to the `maxsize` most recently used chats.
+
+    Only idle locks are evicted, so a chat never ends up with two live locks.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self._maxsize = maxsize
+        self._locks: OrderedDict[int, asyncio.Lock] = OrderedDict()
+
+    def get(self, chat_id: int) -> asyncio.Lock:
+        lock = self._locks.get(chat_id)
+        if lock is not None:
+            self._locks.move_to_end(chat_id)
+            return lock
+        lock = asyncio.Lock()
+        self._locks[chat_id] = lock
+        if len(self._locks) > self._maxsize:
+            self._evict()
+        return lock
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def _evict(self) -> None:
+        for chat_id in list(self._locks):
+            if len(self._locks) <= self._maxsize:
+                break
+            if not self._locks[chat_id].locked():
+                del self._locks[chat_id]
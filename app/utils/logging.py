@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 import logging
+from functools import cache
 
 TRACE_LEVEL = 5
 
 
+@cache
 def ensure_trace_level() -> None:
-    if getattr(logging, "TRACE", None) == TRACE_LEVEL:
-        return
-
     logging.addLevelName(TRACE_LEVEL, "TRACE")
     logging.TRACE = TRACE_LEVEL  # type: ignore[attr-defined]
     logging._nameToLevel["TRACE"] = TRACE_LEVEL  # type: ignore[attr-defined]
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+from prometheus_client import CollectorRegistry
+from prometheus_client.core import CounterMetricFamily, Metric
+
+
+class LoopCounter:
+    """Prometheus counter for values only touched from the event loop.
+
+    ``prometheus_client.Counter`` takes a mutex on every ``inc()``; with a single
+    event-loop thread a plain int is enough, and the value is read on scrape.
+    """
+
+    def __init__(self, name: str, documentation: str, *, registry: CollectorRegistry) -> None:
+        self._name = name
+        self._documentation = documentation
+        self._value = 0.0
+        registry.register(self)
+
+    def inc(self, amount: float = 1) -> None:
+        self._value += amount
+
+    def collect(self) -> Iterator[Metric]:
+        yield CounterMetricFamily(self._name, self._documentation, value=self._value)
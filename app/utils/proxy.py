@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-from typing import Optional
+from typing import NamedTuple, Optional
 from urllib.parse import quote, urlsplit, urlunsplit
 
 import httpx
@@ -15,11 +16,58 @@ NETWORK_PROXY_PORT_ENV = "NETWORK_SOCKS5_PORT"
 NETWORK_PROXY_USER_ENV = "NETWORK_SOCKS5_USERNAME"
 NETWORK_PROXY_PASSWORD_ENV = "NETWORK_SOCKS5_PASSWORD"
 
-_PROXY_URL_CACHE: Optional[str] = None
-_LOGGED_STATUS = False
+_PROXY_ENV_KEYS = (
+    NETWORK_PROXY_URL_ENV,
+    NETWORK_PROXY_HOST_ENV,
+    NETWORK_PROXY_PORT_ENV,
+    NETWORK_PROXY_USER_ENV,
+    NETWORK_PROXY_PASSWORD_ENV,
+)
+
+
+def _read_proxy_env() -> dict[str, str]:
+    return {key: (os.environ.get(key) or "").strip() for key in _PROXY_ENV_KEYS}
+
+
+# The proxy is set by the container environment; read it once at import.
+_ENV_SNAPSHOT = _read_proxy_env()
+
+
+class _ProxyParts(NamedTuple):
+    url: Optional[str]
+    url_plain: Optional[str]
+    display: Optional[str]
+
+
+# Pool limits of the shared proxy transport; clients passing their own transport can't set them.
+POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+
+# Resolved once: the proxy URL, its socks5 variant and the password-free form for logs.
+_PROXY_CACHE: Optional[_ProxyParts] = None
+_TRANSPORT_CACHE: Optional[_SharedTransport] = None
+_TRANSPORT_LOOP: Optional[asyncio.AbstractEventLoop] = None
 
 
 def _sanitize_proxy_url(url: str) -> str:
+    scheme_end = url.find("://")
+    if scheme_end < 0:
+        return _sanitize_proxy_url_slow(url)
+    rest_start = scheme_end + 3
+    # Proxy URLs are scheme://[user[:password]@]host:port[/]; only the password is dropped.
+    # The last "@" ends the credentials even if an unescaped password contains "/" or "@".
+    at = url.rfind("@", rest_start)
+    if at < 0:
+        return url
+    if at == rest_start or url[rest_start] == ":":
+        # Empty username: the slow path drops the whole userinfo.
+        return _sanitize_proxy_url_slow(url)
+    colon = url.find(":", rest_start, at)
+    if colon < 0:
+        return url
+    return url[:colon] + url[at:]
+
+
+def _sanitize_proxy_url_slow(url: str) -> str:
     parts = urlsplit(url)
     username = parts.username or ""
     host = parts.hostname or ""
@@ -28,21 +76,37 @@ def _sanitize_proxy_url(url: str) -> str:
         netloc = f"{username}@{host}"
     if parts.port:
         netloc += f":{parts.port}"
-    return urlunsplit((parts.scheme, netloc, parts.path or "", parts.query or "", parts.fragment or ""))
+    return urlunsplit((parts.scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """Proxy transport shared by every client; closing a client leaves the pool open."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport) -> None:
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+    async def aclose_inner(self) -> None:
+        await self._inner.aclose()
 
 
 def _build_proxy_url() -> Optional[str]:
-    direct = (os.getenv(NETWORK_PROXY_URL_ENV) or "").strip()
+    direct = _ENV_SNAPSHOT[NETWORK_PROXY_URL_ENV]
     if direct:
         return direct
 
-    host = (os.getenv(NETWORK_PROXY_HOST_ENV) or "").strip()
-    port = (os.getenv(NETWORK_PROXY_PORT_ENV) or "").strip()
+    host = _ENV_SNAPSHOT[NETWORK_PROXY_HOST_ENV]
+    port = _ENV_SNAPSHOT[NETWORK_PROXY_PORT_ENV]
     if not host or not port:
         return None
 
-    username = (os.getenv(NETWORK_PROXY_USER_ENV) or "").strip()
-    password = (os.getenv(NETWORK_PROXY_PASSWORD_ENV) or "").strip()
+    username = _ENV_SNAPSHOT[NETWORK_PROXY_USER_ENV]
+    password = _ENV_SNAPSHOT[NETWORK_PROXY_PASSWORD_ENV]
 
     auth = ""
     if username:
@@ -58,36 +122,67 @@ def _build_proxy_url() -> Optional[str]:
     return f"socks5://{auth}{host}:{port}"
 
 
+def _init_proxy_cache() -> _ProxyParts:
+    global _PROXY_CACHE
+    proxy = _build_proxy_url()
+    plain = proxy
+    if proxy and proxy.startswith("socks5h://"):
+        plain = "socks5://" + proxy[len("socks5h://") :]
+    display = _sanitize_proxy_url(proxy) if proxy else None
+    if display:
+        logger.info("Outbound SOCKS5 proxy configured: %s", display)
+    else:
+        logger.info("Outbound SOCKS5 proxy not configured; using direct connections")
+    _PROXY_CACHE = _ProxyParts(proxy, plain, display)
+    return _PROXY_CACHE
+
+
+def reset_proxy_cache() -> None:
+    """Re-read the proxy environment on next use (for tests)."""
+    global _ENV_SNAPSHOT, _PROXY_CACHE, _TRANSPORT_CACHE, _TRANSPORT_LOOP
+    _ENV_SNAPSHOT = _read_proxy_env()
+    _PROXY_CACHE = None
+    _TRANSPORT_CACHE = None
+    _TRANSPORT_LOOP = None
+
+
 def get_proxy_url(*, prefer_plain: bool = False) -> Optional[str]:
-    global _PROXY_URL_CACHE, _LOGGED_STATUS
-    if _PROXY_URL_CACHE is None:
-        _PROXY_URL_CACHE = _build_proxy_url()
-    if not _LOGGED_STATUS:
-        if _PROXY_URL_CACHE:
-            logger.info(
-                "Outbound SOCKS5 proxy configured: %s",
-                _sanitize_proxy_url(_PROXY_URL_CACHE),
-            )
-        else:
-            logger.info("Outbound SOCKS5 proxy not configured; using direct connections")
-        _LOGGED_STATUS = True
-    if not _PROXY_URL_CACHE:
-        return None
-    if prefer_plain and _PROXY_URL_CACHE.startswith("socks5h://"):
-        return "socks5://" + _PROXY_URL_CACHE[len("socks5h://") :]
-    return _PROXY_URL_CACHE
+    parts = _PROXY_CACHE or _init_proxy_cache()
+    return parts.url_plain if prefer_plain else parts.url
 
 
 def get_proxy_display() -> Optional[str]:
-    proxy = get_proxy_url()
-    if not proxy:
-        return None
-    return _sanitize_proxy_url(proxy)
+    return (_PROXY_CACHE or _init_proxy_cache()).display
+
 
+def httpx_client_kwargs(
+    timeout: float = 60.0, *, limits: Optional[httpx.Limits] = None
+) -> dict[str, object]:
+    """Client kwargs for the configured proxy.
 
-def httpx_client_kwargs(timeout: float = 60.0) -> dict[str, object]:
+    httpx ignores ``limits`` when a transport is passed, so with a proxy the
+    shared transport's :data:`POOL_LIMITS` apply instead.
+    """
+    global _TRANSPORT_CACHE, _TRANSPORT_LOOP
     kwargs: dict[str, object] = {"timeout": timeout}
     proxy = get_proxy_url()
     if proxy:
-        kwargs["transport"] = httpx.AsyncHTTPTransport(proxy=proxy)
+        # Pooled connections belong to the loop that opened them, so the transport is per loop.
+        loop = asyncio.get_running_loop()
+        if _TRANSPORT_CACHE is None or _TRANSPORT_LOOP is not loop:
+            _TRANSPORT_CACHE = _SharedTransport(
+                httpx.AsyncHTTPTransport(proxy=proxy, limits=POOL_LIMITS)
+            )
+            _TRANSPORT_LOOP = loop
+        kwargs["transport"] = _TRANSPORT_CACHE
+    elif limits is not None:
+        kwargs["limits"] = limits
     return kwargs
+
+
+async def aclose_proxy_transport() -> None:
+    """Close the shared proxy transport; call after the clients using it are closed."""
+    global _TRANSPORT_CACHE, _TRANSPORT_LOOP
+    transport, _TRANSPORT_CACHE, _TRANSPORT_LOOP = _TRANSPORT_CACHE, None, None
+    if transport is not None:
+        await transport.aclose_inner()
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_insert(session: AsyncSession, model: type) -> postgresql.Insert | sqlite.Insert:
+    """INSERT construct supporting ON CONFLICT for the session's backend."""
+    # Production runs on PostgreSQL; SQLite (tests) speaks the same ON CONFLICT dialect.
+    if session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
@@ -0,0 +1,50 @@
+"""Index messages by chat and recency
+
+Revision ID: 20261015_01_messages_chat_date
+Revises: 20260527_01_spy_sources
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261015_01_messages_chat_date"
+down_revision = "20260527_01_spy_sources"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # messages is the largest table; build without blocking inserts from live chats.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_chat_date",
+            "messages",
+            ["chat_id", sa.text("date DESC")],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # Every lookup by chat_id is served by ix_messages_chat_date or uq_messages_chat_message.
+        op.drop_index(
+            "ix_messages_chat_id",
+            table_name="messages",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_chat_id",
+            "messages",
+            ["chat_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_messages_chat_date",
+            table_name="messages",
+            postgresql_concurrently=True,
+        )
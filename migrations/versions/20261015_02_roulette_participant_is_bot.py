@@ -0,0 +1,39 @@
+"""Flag bot-like roulette participants
+
+Revision ID: 20261015_02_roulette_participant_is_bot
+Revises: 20261015_01_messages_chat_date
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20261015_02_roulette_participant_is_bot"
+down_revision = "20261015_01_messages_chat_date"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "roulette_participants",
+        sa.Column("is_bot", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.execute(
+        "UPDATE roulette_participants SET is_bot = TRUE"
+        " WHERE lower(trim(coalesce(username, ''))) LIKE '%bot'"
+    )
+    op.create_index(
+        "ix_roulette_participants_chat_humans",
+        "roulette_participants",
+        ["chat_id"],
+        unique=False,
+        postgresql_where=sa.text("NOT is_bot"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_roulette_participants_chat_humans", table_name="roulette_participants")
+    op.drop_column("roulette_participants", "is_bot")
@@ -0,0 +1,50 @@
+"""Cover roulette stats with an index-only scan
+
+Revision ID: 20261015_03_roulette_winners_cover
+Revises: 20261015_02_roulette_participant_is_bot
+Create Date: 2026-10-15 00:00:00.000000
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20261015_03_roulette_winners_cover"
+down_revision = "20261015_02_roulette_participant_is_bot"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # Stats filter by chat and won_at range, then group by user; carry those columns.
+        op.create_index(
+            "ix_roulette_winners_chat_date_cover",
+            "roulette_winners",
+            ["chat_id", "won_at"],
+            unique=False,
+            postgresql_include=["user_id", "username"],
+            postgresql_concurrently=True,
+        )
+        # uq_roulette_winners_chat_day already indexes (chat_id, won_at).
+        op.drop_index(
+            "ix_roulette_winners_chat_date",
+            table_name="roulette_winners",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_roulette_winners_chat_date",
+            "roulette_winners",
+            ["chat_id", "won_at"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_roulette_winners_chat_date_cover",
+            table_name="roulette_winners",
+            postgresql_concurrently=True,
+        )
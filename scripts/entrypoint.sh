@@ -3,4 +3,4 @@ set -euo pipefail
 
 ./scripts/migrate.sh
 
-exec uvicorn app.main:app --host 0.0.0.0 --port 8080
+exec uvicorn app.main:app --host 0.0.0.0 --port 8080 --loop uvloop --http httptools
@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.enums import MessageEntityType
+
+from app.bot.router_triggers import (
+    BotIdentity,
+    _is_bot_mentioned,
+    _is_reply_to_bot,
+    get_bot_identity,
+)
+
+
+@pytest.mark.asyncio
+async def test_get_bot_identity_calls_get_me_once() -> None:
+    bot = MagicMock()
+    bot.id = 987654321
+    bot.get_me = AsyncMock(return_value=SimpleNamespace(id=987654321, username="gremlin_bot"))
+
+    first = await get_bot_identity(bot)
+    second = await get_bot_identity(bot)
+
+    assert first == BotIdentity(id=987654321, username="gremlin_bot")
+    assert second is first
+    assert bot.get_me.await_count == 1
+
+
+def _message(text: str, entities: list | None = None) -> SimpleNamespace:
+    return SimpleNamespace(text=text, caption=None, entities=entities, caption_entities=None)
+
+
+def test_is_bot_mentioned_matches_username_case_insensitively() -> None:
+    identity = BotIdentity.build(1, "Gremlin_Bot")
+
+    assert _is_bot_mentioned(_message("эй @gremlin_bot, как дела"), identity)  # type: ignore[arg-type]
+    assert not _is_bot_mentioned(_message("эй @gremlin_bot2"), identity)  # type: ignore[arg-type]
+    assert not _is_bot_mentioned(_message("просто текст"), identity)  # type: ignore[arg-type]
+
+
+def test_is_bot_mentioned_accepts_text_mention_entity() -> None:
+    identity = BotIdentity.build(1, "gremlin_bot")
+    entity = SimpleNamespace(type=MessageEntityType.TEXT_MENTION, user=SimpleNamespace(id=1), offset=0, length=4)
+
+    assert _is_bot_mentioned(_message("Гремлин, ответь", [entity]), identity)  # type: ignore[arg-type]
+
+
+def test_is_reply_to_bot_checks_sender_via_bot_and_sender_chat() -> None:
+    identity = BotIdentity.build(1, "Gremlin_Bot")
+
+    assert _is_reply_to_bot(SimpleNamespace(from_user=SimpleNamespace(id=1)), identity)  # type: ignore[arg-type]
+    assert _is_reply_to_bot(
+        SimpleNamespace(from_user=SimpleNamespace(id=5, username="x"), via_bot=SimpleNamespace(id=9, username="gremlin_bot")),  # type: ignore[arg-type]
+        identity,
+    )
+    assert not _is_reply_to_bot(
+        SimpleNamespace(from_user=SimpleNamespace(id=5, username="x"), via_bot=None, sender_chat=None),  # type: ignore[arg-type]
+        identity,
+    )
@@ -10,8 +10,10 @@ class FakePipeline:
         self._redis = redis
         self._commands: list[Callable[[], Awaitable[Any]]] = []
 
-    def set(self, key: str, value: Any, ex: int | None = None) -> "FakePipeline":
-        self._commands.append(lambda: self._redis.set(key, value, ex=ex))
+    def set(
+        self, key: str, value: Any, ex: int | None = None, nx: bool = False
+    ) -> "FakePipeline":
+        self._commands.append(lambda: self._redis.set(key, value, ex=ex, nx=nx))
         return self
 
     def get(self, key: str) -> "FakePipeline":
@@ -58,7 +60,13 @@ class FakeRedis:
         self._purge_if_expired(key)
         return self._data.get(key)
 
-    async def set(self, key: str, value: Any, ex: int | None = None) -> str:
+    async def set(
+        self, key: str, value: Any, ex: int | None = None, nx: bool = False
+    ) -> str | None:
+        if nx:
+            self._purge_if_expired(key)
+            if key in self._data:
+                return None
         self._data[key] = value
         if ex is None:
             self._expires_at.pop(key, None)
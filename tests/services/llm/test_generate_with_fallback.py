@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 from typing import Any
 from unittest.mock import AsyncMock, patch
 
@@ -9,7 +10,10 @@ from app.services.llm.client import (
     FALLBACK_MAP,
     LLMError,
     LLMRateLimitError,
+    _get_http_client,
+    aclose_http_client,
     generate_with_fallback,
+    warmup,
 )
 
 MESSAGES: list[dict[str, Any]] = [
@@ -164,3 +168,109 @@ async def test_network_error_triggers_fallback() -> None:
 
     assert result == "fallback-ok"
     assert mock_generate.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_warmup_sends_single_token_request_and_swallows_errors() -> None:
+    import httpx
+
+    from app.services.llm import client as llm_client
+
+    seen: list[dict[str, Any]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(json.loads(request.content))
+        return httpx.Response(429, text="slow down", headers={"Retry-After": "120"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch.object(llm_client, "_get_http_client", return_value=client), patch.object(
+        llm_client, "OPENAI_API_KEY", "stub"
+    ), patch.dict(llm_client._rate_limited_until, clear=True), patch.object(
+        llm_client.logger, "warning"
+    ) as warning, patch.object(llm_client.logger, "error") as error:
+        await warmup("openai")
+        assert llm_client._rate_limited_until == {}
+    await client.aclose()
+
+    assert len(seen) == 1
+    assert seen[0]["max_completion_tokens"] == 1
+    warning.assert_not_called()
+    error.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_http_client_is_shared_until_closed() -> None:
+    first = _get_http_client()
+    assert _get_http_client() is first
+
+    await aclose_http_client()
+    assert first.is_closed
+    second = _get_http_client()
+    assert second is not first
+    await aclose_http_client()
+
+
+@pytest.mark.asyncio
+async def test_post_json_sends_utf8_json_body() -> None:
+    import httpx
+
+    from app.services.llm.client import _post_json
+
+    seen: list[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.content)
+        return httpx.Response(200, json={"choices": []})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch("app.services.llm.client._get_http_client", return_value=client):
+        data = await _post_json(
+            label="test",
+            url="https://llm.test/chat",
+            headers={"Content-Type": "application/json"},
+            payload={"messages": [{"role": "user", "content": "привет"}]},
+        )
+    await client.aclose()
+
+    assert data == {"choices": []}
+    assert seen == ['{"messages":[{"role":"user","content":"привет"}]}'.encode()]
+
+
+@pytest.mark.asyncio
+async def test_post_json_retries_short_rate_limit_then_blocks_long_one() -> None:
+    import httpx
+
+    from app.services.llm import client as llm_client
+
+    statuses = [(429, "0"), (200, None), (429, "120")]
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        status, retry_after = statuses[calls]
+        calls += 1
+        headers = {"Retry-After": retry_after} if retry_after else {}
+        return httpx.Response(status, json={"choices": []}, headers=headers)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    kwargs: dict[str, Any] = {
+        "label": "test",
+        "url": "https://llm.test/chat",
+        "headers": {},
+        "payload": {"messages": []},
+    }
+    with patch.object(llm_client, "_get_http_client", return_value=client), patch.object(
+        llm_client.asyncio, "sleep", new=AsyncMock()
+    ) as sleep, patch.dict(llm_client._rate_limited_until, clear=True):
+        assert await llm_client._post_json(**kwargs) == {"choices": []}
+        assert calls == 2
+        sleep.assert_awaited_once()
+
+        with pytest.raises(LLMRateLimitError):
+            await llm_client._post_json(**kwargs)
+        with pytest.raises(LLMRateLimitError) as excinfo:
+            await llm_client._post_json(**kwargs)
+    await client.aclose()
+
+    assert calls == 3
+    assert excinfo.value.retry_after is not None and excinfo.value.retry_after > 100
@@ -17,3 +17,10 @@ def test_rate_limit_error_is_llm_error() -> None:
     exc = LLMRateLimitError("429", retry_after=5.0)
     assert isinstance(exc, LLMError)
     assert exc.retry_after == 5.0
+
+
+def test_truncate_keeps_short_text_and_marks_cut() -> None:
+    from app.services.llm.client import _truncate
+
+    assert _truncate("short") == "short"
+    assert _truncate("x" * 600) == "x" * 512 + "...<88 more chars>"
@@ -49,3 +49,47 @@ async def test_set_invalidates_cache_before_repopulation(
 
     refreshed = await service.get_all()
     assert refreshed["llm_provider"] == "anthropic"
+
+
+async def test_get_all_serves_local_copy_until_set(
+    sessionmaker: async_sessionmaker[AsyncSession], fake_redis: FakeRedis
+) -> None:
+    service = AppConfigService(sessionmaker, fake_redis)
+
+    first = await service.get_all()
+    first["llm_provider"] = "mutated"
+    await fake_redis.delete("app:settings")
+
+    assert (await service.get_all())["llm_provider"] == "openrouter"
+    assert await fake_redis.get("app:settings") is None
+
+    await service.set("llm_provider", "openai")
+    assert (await service.get_all())["llm_provider"] == "openai"
+
+
+async def test_get_reads_single_key_from_local_cache(
+    sessionmaker: async_sessionmaker[AsyncSession], fake_redis: FakeRedis
+) -> None:
+    service = AppConfigService(sessionmaker, fake_redis)
+    await fake_redis.set("app:settings", json.dumps({"llm_provider": "openai"}, ensure_ascii=False))
+
+    assert await service.get("llm_provider") == "openai"
+    await fake_redis.delete("app:settings")
+
+    assert await service.get("llm_provider") == "openai"
+    assert await service.get("context_max_turns") == 100
+
+
+async def test_set_overwrites_existing_row(
+    sessionmaker: async_sessionmaker[AsyncSession], fake_redis: FakeRedis
+) -> None:
+    service = AppConfigService(sessionmaker, fake_redis)
+
+    await service.set("interject_p", 10)
+    await service.set("interject_p", 25)
+
+    async with sessionmaker() as session:
+        row = await session.get(AppSetting, "interject_p")
+        assert row is not None
+        assert row.value == 25
+    assert await service.get("interject_p") == 25
@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.chat import Chat
+from app.models.message import Message
+from app.models.user import User
 from app.services.context import (
     DEFAULT_CHAT_PROMPT,
     DEFAULT_INTERJECT_SUFFIX,
     DEFAULT_STYLE_PROMPTS,
     ChatTurn,
+    ContextService,
+    _is_service_text,
     build_messages,
     build_system_prompt,
 )
@@ -35,6 +45,16 @@ def test_build_messages_filters_service_lines_and_keeps_recent_context() -> None
     ]
 
 
+def test_is_service_text_matches_markers_and_respects_length_guard() -> None:
+    assert _is_service_text("Alice joined via invite link")
+    assert _is_service_text("Bob added Carol to the group")
+    assert _is_service_text("Сообщение закреплено")
+    assert _is_service_text("Message was pinned")
+    assert not _is_service_text("Bob added salt")
+    assert not _is_service_text("the pin was pinned today")
+    assert not _is_service_text("Bob joined the chat " + "x" * 160)
+
+
 def test_build_messages_combines_trailing_user_messages() -> None:
     turns = [
         ChatTurn("alice", 1, "older context", False),
@@ -68,3 +88,44 @@ def test_build_system_prompt_uses_style_default_and_focus_suffix() -> None:
     assert DEFAULT_INTERJECT_SUFFIX not in prompt
     assert "что там 'сегодня'?" in prompt
     assert 'Вопрос: "что там \'сегодня\'?". Ответь одним сообщением.' in prompt
+
+
+def test_build_system_prompt_reuses_base_and_appends_interject_suffix() -> None:
+    first = build_system_prompt({"style": "gopnik"}, interject=True)
+    second = build_system_prompt({"style": "gopnik"}, focus_text="как дела", interject=True)
+
+    assert first.rstrip().endswith(DEFAULT_INTERJECT_SUFFIX)
+    assert second.startswith(first)
+    assert second != first
+
+
+async def test_get_recent_turns_resolves_names_and_caches_them(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    base = datetime(2026, 1, 1, 12, 0)
+    async with sessionmaker() as session:
+        session.add(Chat(id=1, title="chat"))
+        session.add(User(tg_id=10, username="alice"))
+        for idx, (user_id, text) in enumerate([(10, "hi"), (20, "yo"), (0, "sys"), (10, "bye")]):
+            session.add(
+                Message(
+                    chat_id=1,
+                    message_id=idx + 1,
+                    user_id=user_id,
+                    text=text,
+                    date=base + timedelta(seconds=idx),
+                    is_bot=False,
+                )
+            )
+        await session.commit()
+
+    service = ContextService()
+    async with sessionmaker() as session:
+        turns = await service.get_recent_turns(session, 1, limit=3)
+    assert [(turn.speaker, turn.text) for turn in turns] == [("20", "yo"), ("unknown", "sys"), ("alice", "bye")]
+
+    async with sessionmaker() as session:
+        await session.execute(update(User).where(User.tg_id == 10).values(username="renamed"))
+        await session.commit()
+        turns = await service.get_recent_turns(session, 1, limit=1)
+    assert turns[0].speaker == "alice"
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from datetime import datetime
 from typing import Any, cast
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from aiogram import Bot
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.models.chat import Chat
 from app.models.message import Message as DBMessage
 
 
@@ -54,3 +55,77 @@ async def test_last_message_time_ignores_is_bot_filter(
         "if this returns the human msg time, revive will keep spamming "
         "in dead chats every cooldown period."
     )
+
+
+async def test_persist_sent_prefers_background_persister(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    svc = _build_interjector(sessionmaker)
+    svc.persister = MagicMock()
+    svc.persister.enqueue.return_value = True
+    sent = MagicMock()
+
+    await svc._persist_sent(sent, reply_to_message_id=5)
+
+    svc.persister.enqueue.assert_called_once_with(sent, reply_to_message_id=5)
+
+
+async def test_last_message_times_batches_any_sender(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    async with sessionmaker() as session:
+        session.add_all([Chat(id=-1, title="a"), Chat(id=-2, title="b")])
+        session.add_all([
+            DBMessage(chat_id=-1, message_id=1, user_id=1, text="x", is_bot=False,
+                      date=datetime(2026, 4, 1, 10, 0)),
+            DBMessage(chat_id=-1, message_id=2, user_id=999, text="y", is_bot=True,
+                      date=datetime(2026, 4, 2, 10, 0)),
+        ])
+        await session.commit()
+
+    svc = _build_interjector(sessionmaker)
+    async with sessionmaker() as session:
+        result = await svc._get_last_message_times(session, [-1, -2])
+
+    assert result == {-1: datetime(2026, 4, 2, 10, 0), -2: None}
+
+
+async def test_run_idle_checks_revives_each_chat_on_its_own_session(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    async with sessionmaker() as session:
+        session.add_all([Chat(id=-1, title="a"), Chat(id=-2, title="b"), Chat(id=5, title="dm")])
+        await session.commit()
+
+    svc = _build_interjector(sessionmaker)
+    svc.app_config.get_all = AsyncMock(return_value={})
+    svc.settings.get_all = AsyncMock(return_value={"revive_enabled": True})
+    svc.policy.interject_candidates = AsyncMock(side_effect=lambda ids, trigger: list(ids))
+    svc.policy.mark_acted = AsyncMock()
+    sessions: dict[int, AsyncSession] = {}
+
+    async def fake_revive(
+        session: AsyncSession,
+        chat: Chat,
+        now: datetime,
+        app_conf: dict,
+        *,
+        conf: dict,
+        last_time: datetime | None,
+    ) -> bool:
+        assert conf == {"revive_enabled": True}
+        assert last_time is None
+        sessions[chat.id] = session
+        if chat.id == -2:
+            raise RuntimeError("boom")
+        return True
+
+    svc.generate_revive = fake_revive
+
+    await svc.run_idle_checks()
+
+    assert set(sessions) == {-1, -2}
+    assert sessions[-1] is not sessions[-2]
+    svc.policy.mark_acted.assert_awaited_once()
+    # Settings are read once per chat by the sweep, not again inside generate_revive.
+    assert svc.settings.get_all.await_count == 2
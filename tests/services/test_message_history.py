@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.chat import Chat
+from app.models.message import Message
+from app.models.user import User
+from app.services.message_history import (
+    MessagePersister,
+    _message_row,
+    _to_naive_utc,
+    insert_messages,
+    store_telegram_message,
+)
+
+
+def _fake_message(*, message_id: int, title: str | None = "Test", username: str = "alice") -> SimpleNamespace:
+    return SimpleNamespace(
+        message_id=message_id,
+        chat=SimpleNamespace(id=700, type="supergroup", title=title, username=None),
+        from_user=SimpleNamespace(id=42, is_bot=False, username=username, full_name="Alice"),
+        date=datetime.utcnow(),
+        text="hello",
+        caption=None,
+        photo=None,
+        sticker=None,
+        animation=None,
+        video=None,
+        document=None,
+        reply_to_message=None,
+        media_group_id=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_store_message_is_idempotent(sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+    async with sessionmaker() as session:
+        assert await store_telegram_message(session, _fake_message(message_id=1)) is True  # type: ignore[arg-type]
+        assert await store_telegram_message(session, _fake_message(message_id=1)) is False  # type: ignore[arg-type]
+        await session.commit()
+
+    async with sessionmaker() as session:
+        count = await session.scalar(select(func.count()).select_from(Message))
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_store_message_refreshes_chat_title_and_username(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    async with sessionmaker() as session:
+        await store_telegram_message(session, _fake_message(message_id=1))  # type: ignore[arg-type]
+        await store_telegram_message(
+            session,
+            _fake_message(message_id=2, title="Renamed", username="alice2"),  # type: ignore[arg-type]
+        )
+        await store_telegram_message(
+            session,
+            _fake_message(message_id=3, title=None, username="alice2"),  # type: ignore[arg-type]
+        )
+        await session.commit()
+
+    async with sessionmaker() as session:
+        chat = await session.get(Chat, 700)
+        user = (await session.execute(select(User).where(User.tg_id == 42))).scalar_one()
+    assert chat is not None
+    assert chat.title == "Renamed"
+    assert user.username == "alice2"
+
+
+@pytest.mark.asyncio
+async def test_message_persister_writes_queued_messages_in_one_batch(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    persister = MessagePersister(sessionmaker, maxsize=2)
+    assert persister.enqueue(_fake_message(message_id=1)) is True  # type: ignore[arg-type]
+    assert persister.enqueue(_fake_message(message_id=2), reply_to_message_id=1) is True  # type: ignore[arg-type]
+    assert persister.enqueue(_fake_message(message_id=3)) is False  # type: ignore[arg-type]
+
+    await persister.flush()
+
+    async with sessionmaker() as session:
+        rows = (await session.execute(select(Message).order_by(Message.message_id))).scalars().all()
+    assert [row.message_id for row in rows] == [1, 2]
+    assert rows[1].reply_to_id == 1
+
+
+@pytest.mark.asyncio
+async def test_message_persister_stop_writes_batch_in_hand(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    persister = MessagePersister(sessionmaker, max_delay=60)
+    task = asyncio.create_task(persister.run())
+    persister.enqueue(_fake_message(message_id=1))  # type: ignore[arg-type]
+    persister.enqueue(_fake_message(message_id=2))  # type: ignore[arg-type]
+    await asyncio.sleep(0)
+
+    await persister.stop()
+    await asyncio.wait_for(task, timeout=5)
+
+    async with sessionmaker() as session:
+        count = await session.scalar(select(func.count()).select_from(Message))
+    assert count == 2
+
+
+def test_to_naive_utc_normalises_aware_and_missing_dates() -> None:
+    aware = datetime(2026, 1, 1, 15, 0, tzinfo=timezone(timedelta(hours=3)))
+
+    assert _to_naive_utc(aware) == datetime(2026, 1, 1, 12, 0)
+    assert _to_naive_utc(datetime(2026, 1, 1, 12, 0)) == datetime(2026, 1, 1, 12, 0)
+    assert _to_naive_utc(None).tzinfo is None
+
+
+@pytest.mark.asyncio
+async def test_known_chat_and_user_skip_upserts(sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+    async with sessionmaker() as session:
+        await store_telegram_message(session, _fake_message(message_id=1))  # type: ignore[arg-type]
+        await session.commit()
+
+    executed: list[str] = []
+    async with sessionmaker() as session:
+        original_execute = session.execute
+
+        async def _spy(stmt, *args, **kwargs):
+            executed.append(stmt.table.name)
+            return await original_execute(stmt, *args, **kwargs)
+
+        session.execute = _spy  # type: ignore[assignment]
+        await store_telegram_message(session, _fake_message(message_id=2))  # type: ignore[arg-type]
+        await session.commit()
+
+    assert executed == ["messages"]
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_upserts_are_not_cached(sessionmaker: async_sessionmaker[AsyncSession]) -> None:
+    async with sessionmaker() as session:
+        await store_telegram_message(session, _fake_message(message_id=1, title="Lost"))  # type: ignore[arg-type]
+        await session.rollback()
+
+    async with sessionmaker() as session:
+        await store_telegram_message(session, _fake_message(message_id=2, title="Lost"))  # type: ignore[arg-type]
+        await session.commit()
+
+    async with sessionmaker() as session:
+        chat = await session.get(Chat, 700)
+        user = (await session.execute(select(User).where(User.tg_id == 42))).scalar_one_or_none()
+    assert chat is not None
+    assert chat.title == "Lost"
+    assert user is not None
+
+
+@pytest.mark.asyncio
+async def test_insert_messages_skips_duplicates_and_existing_rows(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    async with sessionmaker() as session:
+        await store_telegram_message(session, _fake_message(message_id=1))  # type: ignore[arg-type]
+        rows = [
+            _message_row(_fake_message(message_id=message_id))  # type: ignore[arg-type]
+            for message_id in (1, 2, 3, 3)
+        ]
+        inserted = await insert_messages(session, rows)
+        await session.commit()
+
+        total = await session.scalar(select(func.count()).select_from(Message))
+    assert inserted == 2
+    assert total == 3
@@ -21,6 +21,7 @@ from app.services.persona import StylePromptService
 from app.services.roulette import RouletteService
 from app.services.settings import SettingsService
 from app.services.user_memory import UserMemoryService
+from tests.fakes import FakeRedis
 
 
 def _member(name: str, *, username: str = "") -> object:
@@ -75,6 +76,7 @@ async def test_e2e_announces_winner_with_real_aggregator(sessionmaker):
     roulette = RouletteService(
         bot=bot,
         sessionmaker=sessionmaker,
+        redis=FakeRedis(),  # type: ignore[arg-type]
         settings=create_autospec(SettingsService, instance=True),
         app_config=create_autospec(AppConfigService, instance=True),
         context=create_autospec(ContextService, instance=True),
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 import textwrap
 from pathlib import Path
+from unittest.mock import AsyncMock
 
-from app.services.persona import load_persona_files, parse_persona_file
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.persona import StylePromptService, load_persona_files, parse_persona_file
+from tests.fakes import FakeRedis
 
 
 def test_parse_persona_file_extracts_display_name_and_prompt():
@@ -51,3 +57,91 @@ def test_load_persona_files_reads_all_md_files(tmp_path: Path) -> None:
 def test_load_persona_files_returns_empty_for_missing_dir():
     result = load_persona_files(Path("/nonexistent/path"))
     assert result == {}
+
+
+async def test_concurrent_get_all_shares_one_load(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    service = StylePromptService(
+        sessionmaker, FakeRedis(), {"gopnik": {"display_name": "Гопник", "prompt": "p"}}  # type: ignore[arg-type]
+    )
+    loads = 0
+    fetch_all = service._fetch_all
+
+    async def counting_fetch_all():
+        nonlocal loads
+        loads += 1
+        return await fetch_all()
+
+    service._fetch_all = counting_fetch_all  # type: ignore[method-assign]
+
+    results = await asyncio.gather(*(service.get_all() for _ in range(5)))
+
+    assert results == [{"gopnik": "p"}] * 5
+    assert loads == 1
+
+
+async def test_display_map_is_cached_until_persona_changes(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    service = StylePromptService(
+        sessionmaker, FakeRedis(), {"gopnik": {"display_name": "Гопник", "prompt": "p"}}  # type: ignore[arg-type]
+    )
+    assert await service.list_styles() == [("gopnik", "Гопник")]
+
+    await service.set("poet", "rhymes", display_name="Поэт")
+    assert await service.list_styles() == [("gopnik", "Гопник"), ("poet", "Поэт")]
+
+    await service.delete("poet")
+    assert await service.get_display_map() == {"gopnik": "Гопник"}
+
+
+async def test_display_map_is_shared_through_redis(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    redis = FakeRedis()
+    defaults = {"gopnik": {"display_name": "Гопник", "prompt": "p"}}
+    writer = StylePromptService(sessionmaker, redis, defaults)  # type: ignore[arg-type]
+    await writer.set("poet", "rhymes", display_name="Поэт")
+    assert await writer.get_display_map() == {"gopnik": "Гопник", "poet": "Поэт"}
+
+    reader = StylePromptService(sessionmaker, redis, defaults)  # type: ignore[arg-type]
+    reader._fetch_all = AsyncMock(side_effect=AssertionError("display map should come from Redis"))  # type: ignore[method-assign]
+    assert await reader.get_display_map() == {"gopnik": "Гопник", "poet": "Поэт"}
+
+    await writer.set("poet", "rhymes", display_name="Поэт 2")
+    assert await redis.get("style_prompts:display:v1") is None
+
+
+async def test_set_many_writes_batch_and_invalidates_cache_once(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    redis = FakeRedis()
+    service = StylePromptService(
+        sessionmaker, redis, {"gopnik": {"display_name": "Гопник", "prompt": "p"}}  # type: ignore[arg-type]
+    )
+    await service.set("poet", "rhymes", display_name="Поэт")
+    assert (await service.get_all())["poet"] == "rhymes"
+
+    await service.set_many({"poet": ("sonnets", None), "bard": ("songs", "Бард")})
+
+    assert await service.get_all() == {"gopnik": "p", "poet": "sonnets", "bard": "songs"}
+    assert await service.get_display_map() == {"gopnik": "Гопник", "poet": "Поэт", "bard": "Бард"}
+
+    with pytest.raises(ValueError):
+        await service.set_many({"gopnik": ("x", None), "bard": ("ignored", None)})
+    assert (await service.get("bard")) == "songs"
+
+
+async def test_normalize_entry_rejects_each_invalid_entry_on_its_own(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    service = StylePromptService(
+        sessionmaker, FakeRedis(), {"gopnik": {"display_name": "Гопник", "prompt": "p"}}  # type: ignore[arg-type]
+    )
+
+    assert service.normalize_entry(" Poet ", " Поэт ") == ("poet", "Поэт")
+    assert service.normalize_entry("poet", None) == ("poet", None)
+    for style, display in (("", None), ("gopnik", None), ("poet", "  ")):
+        with pytest.raises(ValueError):
+            service.normalize_entry(style, display)
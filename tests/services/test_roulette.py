@@ -1,19 +1,35 @@
 from __future__ import annotations
 
+import importlib.util
+from pathlib import Path
+from types import ModuleType
 from typing import Any, cast
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
 from aiogram import Bot
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.models import Chat
-from app.models.roulette import RouletteParticipant
+from app.models.chat import ChatSetting
+from app.models.roulette import RouletteParticipant, RouletteWinner
 from app.services.roulette import (
     DEFAULT_GENERATED_TITLE,
     RouletteService,
     _coerce_float,
     _coerce_int,
 )
+from tests.fakes import FakeRedis
+
+
+def _load_migration(filename: str) -> ModuleType:
+    path = Path(__file__).resolve().parents[2] / "migrations" / "versions" / filename
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
 
 class DummySettings:
@@ -55,6 +71,7 @@ def build_service(
     return RouletteService(
         bot=cast(Bot, object()),
         sessionmaker=sessionmaker,
+        redis=cast(Any, FakeRedis()),
         settings=cast(Any, DummySettings(settings_values)),
         app_config=cast(Any, DummyAppConfig(app_config_values)),
         context=cast(Any, DummyContext()),
@@ -70,10 +87,12 @@ async def test_run_auto_roll_excludes_private_chats(
     async with sessionmaker() as session:
         session.add(Chat(id=-1001, title="Group", is_active=True))
         session.add(Chat(id=291444921, title="Private DM", is_active=True))
+        session.add(RouletteParticipant(chat_id=-1001, user_id=1, username="a"))
+        session.add(RouletteParticipant(chat_id=291444921, user_id=1, username="a"))
+        session.add(ChatSetting(chat_id=-1001, key="roulette_auto_enabled", value=True))
+        session.add(ChatSetting(chat_id=291444921, key="roulette_auto_enabled", value=True))
         await session.commit()
 
-    service._has_winner_today = AsyncMock(return_value=False)  # type: ignore[method-assign]
-    service._fetch_participants = AsyncMock(return_value=[object()])  # type: ignore[method-assign]
     roll_result = type("RollResult", (), {"success": True, "message": "ok"})()
     service.roll = AsyncMock(return_value=roll_result)  # type: ignore[method-assign]
 
@@ -82,6 +101,41 @@ async def test_run_auto_roll_excludes_private_chats(
     service.roll.assert_awaited_once_with(-1001, initiator="auto", force=False)
 
 
+async def test_run_auto_roll_skips_chats_with_winner_or_no_participants(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    service = build_service(sessionmaker)
+    async with sessionmaker() as session:
+        session.add_all([
+            Chat(id=-1, title="rolled", is_active=True),
+            Chat(id=-2, title="empty", is_active=True),
+            Chat(id=-3, title="due", is_active=True),
+            Chat(id=-4, title="auto off", is_active=True),
+            Chat(id=-5, title="no flag", is_active=True),
+        ])
+        session.add_all([
+            RouletteParticipant(chat_id=chat_id, user_id=1, username="a")
+            for chat_id in (-1, -3, -4, -5)
+        ])
+        session.add_all([
+            ChatSetting(chat_id=chat_id, key="roulette_auto_enabled", value=True)
+            for chat_id in (-1, -2, -3)
+        ])
+        session.add(ChatSetting(chat_id=-4, key="roulette_auto_enabled", value=False))
+        session.add(RouletteWinner(
+            chat_id=-1, user_id=1, username="a", title="t", title_code="c",
+            won_at=service._today(),
+        ))
+        await session.commit()
+
+    roll_result = type("RollResult", (), {"success": True, "message": "ok"})()
+    service.roll = AsyncMock(return_value=roll_result)  # type: ignore[method-assign]
+
+    await service.run_auto_roll()
+
+    service.roll.assert_awaited_once_with(-3, initiator="auto", force=False)
+
+
 async def test_register_participant_rejects_bot_like_username_with_whitespace(
     sessionmaker: async_sessionmaker[AsyncSession],
 ) -> None:
@@ -95,6 +149,44 @@ async def test_register_participant_rejects_bot_like_username_with_whitespace(
     assert participants == []
 
 
+async def test_register_participant_upserts_and_refreshes_username(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    service = build_service(sessionmaker)
+
+    assert await service.register_participant(1, 101, "old") == (True, 1)
+    assert await service.register_participant(1, 101, "new") == (False, 1)
+    assert await service.register_participant(1, 101, None) == (False, 1)
+
+    async with sessionmaker() as session:
+        participant = (await session.execute(select(RouletteParticipant))).scalar_one()
+    assert participant.username == "new"
+
+
+async def test_participant_count_is_cached_and_kept_current(
+    sessionmaker: async_sessionmaker[AsyncSession],
+) -> None:
+    service = build_service(sessionmaker)
+    async with sessionmaker() as session:
+        session.add(RouletteParticipant(chat_id=1, user_id=100, username="legacy_bot", is_bot=True))
+        await session.commit()
+
+    assert await service.participant_count(1) == 0
+    assert await service.register_participant(1, 101, "a") == (True, 1)
+    # A concurrent refresh cached a count that already includes the next write.
+    await service.redis.set("roulette:count:1", 2)
+    assert await service.register_participant(1, 102, "b") == (True, 2)
+    assert await service.redis.get("roulette:count:1") is None
+    assert await service.participant_count(1) == 2
+    cached = await service.redis.get("roulette:count:1")
+    assert cached is not None
+    assert int(cached) == 2
+    assert await service.unregister_participant(1, 100) == (True, 2)
+    assert await service.unregister_participant(1, 101) == (True, 1)
+    assert await service.unregister_participant(1, 102) == (True, 0)
+    assert await service.participant_count(1) == 0
+
+
 async def test_pick_title_prefers_custom_title_without_llm(
     sessionmaker: async_sessionmaker[AsyncSession],
 ) -> None:
@@ -119,6 +211,34 @@ async def test_pick_title_prefers_custom_title_without_llm(
 
 async def test_participant_count_ignores_legacy_bot_like_usernames_with_whitespace(
     sessionmaker: async_sessionmaker[AsyncSession],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    service = build_service(sessionmaker)
+
+    async with sessionmaker() as session:
+        session.add_all(
+            [
+                RouletteParticipant(chat_id=1, user_id=1, username="real_user"),
+                RouletteParticipant(chat_id=1, user_id=2, username="LegacyHelperBot "),
+                RouletteParticipant(chat_id=1, user_id=3, username=None),
+            ]
+        )
+        await session.commit()
+
+    # Run the is_bot backfill from the migration over rows stored before the flag existed.
+    migration = _load_migration("20261015_02_roulette_participant_is_bot.py")
+    op = MagicMock()
+    monkeypatch.setattr(migration, "op", op)
+    migration.upgrade()
+    async with sessionmaker() as session:
+        await session.execute(text(op.execute.call_args.args[0]))
+        await session.commit()
+
+    assert await service.participant_count(1) == 2
+
+
+async def test_reregistering_legacy_bot_row_with_normal_username_counts_it(
+    sessionmaker: async_sessionmaker[AsyncSession],
 ) -> None:
     service = build_service(sessionmaker)
 
@@ -126,12 +246,20 @@ async def test_participant_count_ignores_legacy_bot_like_usernames_with_whitespa
         session.add_all(
             [
                 RouletteParticipant(chat_id=1, user_id=1, username="real_user"),
-                RouletteParticipant(chat_id=1, user_id=2, username="legacyhelperbot "),
+                RouletteParticipant(chat_id=1, user_id=2, username="helperbot", is_bot=True),
             ]
         )
         await session.commit()
 
     assert await service.participant_count(1) == 1
+    assert await service.register_participant(1, 2, "helper") == (False, 2)
+    assert await service.participant_count(1) == 2
+
+    async with sessionmaker() as session:
+        row = (
+            await session.execute(select(RouletteParticipant).where(RouletteParticipant.user_id == 2))
+        ).scalar_one()
+    assert (row.username, row.is_bot) == ("helper", False)
 
 
 async def test_pick_title_returns_default_when_generator_returns_none(
@@ -283,3 +411,11 @@ async def test_winner_result_prompt_identifies_winner_and_isolates_their_message
     assert "не приписыв" in joined.lower() or "не цитируй" in joined.lower() or (
         "чужих" in joined.lower() and "реплик" in joined.lower()
     ), "Prompt must warn against attributing other users' messages to the winner"
+
+
+def test_escape_html_escapes_each_special_char_once() -> None:
+    from app.services.roulette import escape_html
+
+    assert escape_html('<b>"Tom" & Jerry</b>') == "&lt;b&gt;&quot;Tom&quot; &amp; Jerry&lt;/b&gt;"
+    assert escape_html("&amp;") == "&amp;amp;"
+    assert escape_html(None) == "Игрок"
@@ -38,3 +38,44 @@ async def test_set_creates_chat_and_invalidates_cache(
     assert row.value == "jarvis"
     assert await fake_redis.get("chat:10:setting:style") is None
     assert await service.get(10, "style") == "jarvis"
+
+
+async def test_get_all_is_cached_and_invalidated_on_set(
+    sessionmaker: async_sessionmaker[AsyncSession], fake_redis: FakeRedis
+) -> None:
+    service = SettingsService(sessionmaker, fake_redis)
+
+    assert (await service.get_all(10))["style"] == "gopnik"
+
+    async with sessionmaker() as session:
+        session.add(Chat(id=10, title="10", is_active=True))
+        session.add(ChatSetting(chat_id=10, key="style", value="boss"))
+        await session.commit()
+
+    assert (await service.get_all(10))["style"] == "gopnik"
+
+    await service.set(10, "temperature", 0.5)
+    conf = await service.get_all(10)
+    assert conf["style"] == "boss"
+    assert conf["temperature"] == 0.5
+
+
+async def test_get_all_reads_shared_redis_cache(
+    sessionmaker: async_sessionmaker[AsyncSession], fake_redis: FakeRedis
+) -> None:
+    async with sessionmaker() as session:
+        session.add(Chat(id=10, title="10", is_active=True))
+        session.add(ChatSetting(chat_id=10, key="style", value="boss"))
+        await session.commit()
+
+    assert (await SettingsService(sessionmaker, fake_redis).get_all(10))["style"] == "boss"
+    assert json.loads(await fake_redis.get("chat:10:settings:v1")) == {"style": "boss"}
+
+    # A fresh process-local cache is served from Redis, not the DB.
+    await fake_redis.set("chat:10:settings:v1", json.dumps({"style": "jarvis"}))
+    other = SettingsService(sessionmaker, fake_redis)
+    assert (await other.get_all(10))["style"] == "jarvis"
+
+    await other.set(10, "style", "zoomer")
+    assert await fake_redis.get("chat:10:settings:v1") is None
+    assert (await SettingsService(sessionmaker, fake_redis).get_all(10))["style"] == "zoomer"
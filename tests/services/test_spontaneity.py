@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from unittest.mock import AsyncMock
 
 import pytest
@@ -9,6 +10,7 @@ from app.services.spontaneity import (
     InterjectTrigger,
     SpontaneityPolicy,
 )
+from tests.fakes import FakeRedis
 
 
 def _make_policy(
@@ -42,20 +44,20 @@ async def test_mark_acted_interject_sets_long_timer() -> None:
     policy = _make_policy(now=1_234_567.0)
     await policy.mark_acted(chat_id=-100, action=ActionKind.INTERJECT)
     policy._redis.set.assert_awaited_once_with(  # type: ignore[attr-defined]
-        "spontaneity:long:-100",
+        "spontaneity:cd:long:-100",
         "1234567.0",
-        ex=86400,
+        ex=30 * 60,
     )
 
 
 @pytest.mark.asyncio
 async def test_mark_acted_direct_reply_sets_long_timer() -> None:
-    policy = _make_policy(now=1_234_567.0)
+    policy = _make_policy(now=1_234_567.0, app_conf={"interject_cooldown_min": 45})
     await policy.mark_acted(chat_id=-100, action=ActionKind.DIRECT_REPLY)
     policy._redis.set.assert_awaited_once_with(  # type: ignore[attr-defined]
-        "spontaneity:long:-100",
+        "spontaneity:cd:long:-100",
         "1234567.0",
-        ex=86400,
+        ex=45 * 60,
     )
 
 
@@ -64,31 +66,62 @@ async def test_mark_acted_reaction_sets_short_timer() -> None:
     policy = _make_policy(now=1_234_567.0)
     await policy.mark_acted(chat_id=-100, action=ActionKind.REACTION)
     policy._redis.set.assert_awaited_once_with(  # type: ignore[attr-defined]
-        "spontaneity:short:-100",
+        "spontaneity:cd:short:-100",
         "1234567.0",
-        ex=86400,
+        ex=10 * 60,
     )
 
 
+@pytest.mark.asyncio
+async def test_mark_acted_skips_write_without_cooldown() -> None:
+    policy = _make_policy(app_conf={"react_cooldown_min": 0})
+    await policy.mark_acted(chat_id=-100, action=ActionKind.REACTION)
+    policy._redis.set.assert_not_awaited()  # type: ignore[attr-defined]
+
+
 @pytest.mark.asyncio
 async def test_can_interject_false_if_long_cooldown_active() -> None:
-    policy = _make_policy(
-        now=1_000_100.0,
-        app_conf={"interject_p": 100, "interject_cooldown_min": 30},
-    )
-    policy._redis.get = AsyncMock(return_value=b"1000000.0")  # type: ignore[method-assign]
+    policy = _make_policy(app_conf={"interject_p": 100, "interject_cooldown_min": 30})
+    policy._redis.set = AsyncMock(return_value=None)  # type: ignore[method-assign]
     assert await policy.can_interject(chat_id=-100, trigger=InterjectTrigger.NEW_MESSAGE) is False
 
 
 @pytest.mark.asyncio
-async def test_can_interject_true_after_long_cooldown_expired() -> None:
+async def test_can_interject_claims_long_cooldown() -> None:
     policy = _make_policy(
-        now=1_000_000.0 + 30 * 60 + 1,
+        now=1_000_000.0,
         rng=0.01,  # dice passes
         app_conf={"interject_p": 100, "interject_cooldown_min": 30},
     )
-    policy._redis.get = AsyncMock(return_value=b"1000000.0")  # type: ignore[method-assign]
     assert await policy.can_interject(chat_id=-100, trigger=InterjectTrigger.NEW_MESSAGE) is True
+    policy._redis.set.assert_awaited_once_with(  # type: ignore[attr-defined]
+        "spontaneity:cd:long:-100", "1000000.0", ex=30 * 60, nx=True
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_interjects_only_one_wins() -> None:
+    policy = _make_policy(app_conf={"interject_p": 100, "interject_cooldown_min": 30})
+    policy._redis = FakeRedis()  # type: ignore[assignment]
+    results = await asyncio.gather(
+        *(policy.can_interject(-100, trigger=InterjectTrigger.NEW_MESSAGE) for _ in range(5))
+    )
+    assert results.count(True) == 1
+
+
+@pytest.mark.asyncio
+async def test_released_claim_does_not_consume_cooldown() -> None:
+    policy = _make_policy(app_conf={"interject_p": 100, "reaction_p": 100})
+    policy._redis = FakeRedis()  # type: ignore[assignment]
+
+    assert await policy.can_interject(-100, trigger=InterjectTrigger.NEW_MESSAGE) is True
+    assert await policy.can_react(-100) is True
+    # The reply and the reaction both failed, so nothing was posted.
+    await policy.release(chat_id=-100, action=ActionKind.INTERJECT)
+    await policy.release(chat_id=-100, action=ActionKind.REACTION)
+
+    assert await policy.can_interject(-100, trigger=InterjectTrigger.NEW_MESSAGE) is True
+    assert await policy.can_react(-100) is True
 
 
 @pytest.mark.asyncio
@@ -109,10 +142,17 @@ async def test_can_interject_false_when_dice_fails() -> None:
     assert await policy.can_interject(chat_id=-100, trigger=InterjectTrigger.NEW_MESSAGE) is False
 
 
+@pytest.mark.asyncio
+async def test_failed_dice_skips_cooldown_lookup() -> None:
+    policy = _make_policy(rng=0.99, app_conf={"interject_p": 5, "reaction_p": 5})
+    assert await policy.can_interject(chat_id=-100, trigger=InterjectTrigger.NEW_MESSAGE) is False
+    assert await policy.can_react(chat_id=-100) is False
+    policy._redis.set.assert_not_awaited()  # type: ignore[attr-defined]
+
+
 @pytest.mark.asyncio
 async def test_can_interject_new_chat_no_redis_key_passes_dice() -> None:
     policy = _make_policy(rng=0.01, app_conf={"interject_p": 5})
-    policy._redis.get = AsyncMock(return_value=None)  # type: ignore[method-assign]
     assert await policy.can_interject(chat_id=-100, trigger=InterjectTrigger.NEW_MESSAGE) is True
 
 
@@ -127,33 +167,29 @@ async def test_can_interject_revive_uses_revive_p_not_interject_p() -> None:
 
 @pytest.mark.asyncio
 async def test_can_interject_revive_respects_long_cooldown() -> None:
-    policy = _make_policy(
-        now=1_000_100.0,
-        app_conf={"interject_cooldown_min": 30, "revive_p": 100},
-    )
-    policy._redis.get = AsyncMock(return_value=b"1000000.0")  # type: ignore[method-assign]
+    policy = _make_policy(app_conf={"interject_cooldown_min": 30, "revive_p": 100})
+    policy._redis.set = AsyncMock(return_value=None)  # type: ignore[method-assign]
     assert await policy.can_interject(chat_id=-100, trigger=InterjectTrigger.REVIVE) is False
 
 
 @pytest.mark.asyncio
 async def test_can_react_false_if_short_cooldown_active() -> None:
-    policy = _make_policy(
-        now=1_000_100.0,
-        app_conf={"reaction_p": 100, "react_cooldown_min": 10},
-    )
-    policy._redis.get = AsyncMock(return_value=b"1000000.0")  # type: ignore[method-assign]
+    policy = _make_policy(app_conf={"reaction_p": 100, "react_cooldown_min": 10})
+    policy._redis.set = AsyncMock(return_value=None)  # type: ignore[method-assign]
     assert await policy.can_react(chat_id=-100) is False
 
 
 @pytest.mark.asyncio
-async def test_can_react_true_after_short_cooldown_expired() -> None:
+async def test_can_react_claims_short_cooldown() -> None:
     policy = _make_policy(
-        now=1_000_000.0 + 10 * 60 + 1,
+        now=1_000_000.0,
         rng=0.01,
         app_conf={"reaction_p": 100, "react_cooldown_min": 10},
     )
-    policy._redis.get = AsyncMock(return_value=b"1000000.0")  # type: ignore[method-assign]
     assert await policy.can_react(chat_id=-100) is True
+    policy._redis.set.assert_awaited_once_with(  # type: ignore[attr-defined]
+        "spontaneity:cd:short:-100", "1000000.0", ex=10 * 60, nx=True
+    )
 
 
 @pytest.mark.asyncio
@@ -163,8 +199,8 @@ async def test_can_react_independent_of_long_timer() -> None:
         rng=0.01,
         app_conf={"reaction_p": 100, "react_cooldown_min": 10, "interject_cooldown_min": 30},
     )
-    # Only `spontaneity:short:-100` is queried; `spontaneity:long:-100` shouldn't block
-    policy._redis.get = AsyncMock(return_value=None)  # type: ignore[method-assign]
+    policy._redis = FakeRedis()  # type: ignore[assignment]
+    await policy.mark_acted(chat_id=-100, action=ActionKind.INTERJECT)
     assert await policy.can_react(chat_id=-100) is True
 
 
@@ -233,3 +269,19 @@ async def test_should_reply_with_voice_respects_quiet_hours() -> None:
     assert await policy.should_reply_with_voice(
         chat_id=-100, incoming_is_voice_reply_to_bot=True,
     ) is False
+
+
+@pytest.mark.asyncio
+async def test_interject_candidates_claims_cooldowns_in_one_pipeline() -> None:
+    policy = _make_policy(
+        rng=0.01,
+        app_conf={"revive_p": 50, "interject_cooldown_min": 30},
+    )
+    redis = FakeRedis()
+    await redis.set("spontaneity:cd:long:-1", "1", ex=60)
+    policy._redis = redis  # type: ignore[assignment]
+
+    allowed = await policy.interject_candidates([-1, -2], trigger=InterjectTrigger.REVIVE)
+
+    assert allowed == [-2]
+    assert await policy.interject_candidates([-2], trigger=InterjectTrigger.REVIVE) == []
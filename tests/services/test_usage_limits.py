@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from datetime import datetime
 from zoneinfo import ZoneInfo
 
+import pytest
+
+from app.services import usage_limits
 from app.services.usage_limits import UsageLimiter
 from tests.fakes import FakeRedis
 
@@ -52,3 +56,47 @@ async def test_refund_missing_key_does_not_leave_zero_key(fake_redis: FakeRedis)
     await limiter.refund(42, ["summary"])
 
     assert await fake_redis.get(key) is None
+
+
+def test_day_boundary_is_cached_until_midnight(monkeypatch: pytest.MonkeyPatch) -> None:
+    tz = ZoneInfo("Europe/Moscow")
+    clock = {"now": datetime(2024, 3, 1, 23, 58, 30, tzinfo=tz)}
+    calls = 0
+
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            nonlocal calls
+            calls += 1
+            return clock["now"]
+
+    monkeypatch.setattr(usage_limits, "datetime", FakeDatetime)
+    monkeypatch.setattr(usage_limits.time, "time", lambda: clock["now"].timestamp())
+    limiter = UsageLimiter(FakeRedis(), timezone=tz)
+
+    assert limiter._key("llm", 1) == "usage:llm:1:20240301"
+    assert limiter._seconds_left() == 90
+    assert calls == 1
+
+    clock["now"] = datetime(2024, 3, 2, 0, 0, 5, tzinfo=tz)
+    assert limiter._key("llm", 1) == "usage:llm:1:20240302"
+    assert calls == 2
+
+
+async def test_refund_is_one_round_trip_when_counters_are_positive(fake_redis: FakeRedis) -> None:
+    limiter = UsageLimiter(fake_redis)
+    await limiter.consume(42, [("summary", 5), ("llm", 5)])
+    calls = 0
+    pipeline = fake_redis.pipeline
+
+    def counting_pipeline():
+        nonlocal calls
+        calls += 1
+        return pipeline()
+
+    fake_redis.pipeline = counting_pipeline  # type: ignore[method-assign]
+    await limiter.refund(42, ["summary", "llm"])
+
+    assert calls == 1
+    assert await limiter.get_usage(42, "summary") == 0
+    assert await limiter.get_usage(42, "llm") == 0
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import pytest
+
+from app.utils.locks import ChatLockRegistry
+
+
+def test_registry_returns_same_lock_per_chat() -> None:
+    registry = ChatLockRegistry()
+    assert registry.get(1) is registry.get(1)
+    assert registry.get(1) is not registry.get(2)
+
+
+@pytest.mark.asyncio
+async def test_registry_evicts_least_recent_idle_lock() -> None:
+    registry = ChatLockRegistry(maxsize=2)
+    held = registry.get(1)
+    async with held:
+        second = registry.get(2)
+        registry.get(3)
+        assert len(registry) == 2
+        assert registry.get(1) is held
+        assert registry.get(2) is not second
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from app.utils.metrics import LoopCounter
+
+
+def test_loop_counter_is_exposed_on_scrape() -> None:
+    registry = CollectorRegistry()
+    counter = LoopCounter("tg_updates_total", "Telegram updates received", registry=registry)
+
+    counter.inc()
+    counter.inc(2)
+
+    output = generate_latest(registry).decode()
+    assert "# TYPE tg_updates_total counter" in output
+    assert "tg_updates_total 3.0" in output